@@ -1,32 +1,50 @@
-from langchain_community.tools.yahoo_finance_news import YahooFinanceNewsTool
-from langgraph.prebuilt import create_react_agent
-from langchain_groq import ChatGroq
 from langchain_core.tools import tool
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from pydantic import BaseModel
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+import yfinance as yf
+import json
+import time
 import os
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+from agents.market_cache import market_cache
+from agents import resources, telemetry
+from agents.compact_data import serialize_history, serialize_options
+from agents.indicators import compute_indicators, format_indicator_summary, indicators_to_dict
+from agents.ticker_extractor import extract_tickers, extract_time_from, get_default_time_from
 load_dotenv()
 api_key = os.getenv("GROQ_API_KEY")
 
+# YahooFinanceNewsTool reports a missing ticker or an empty feed as a plain string
+NEWS_UNAVAILABLE_PREFIXES = ("Company ticker ", "No news found for company")
+
+
+def fetch_news(query: str) -> str:
+    """Runs the news tool; "not found" and empty answers raise ValueError so they are never cached."""
+    content = resources.get("yahoo_news_tool").run(query)
+    if not content or not content.strip() or content.startswith(NEWS_UNAVAILABLE_PREFIXES):
+        raise ValueError(content or f"No news found for {query}.")
+    return content
+
+
 @tool
 def yahoo_finance_news(query: str) -> List[str]:
     """
     Fetches the latest Yahoo Finance news for a given stock symbol or company name and splits the content into chunks.
     Example input: "MSFT" or "Microsoft"
     """
-    # Initialize the text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""]
-    )
+    # Shared text splitter and news tool, built on first use
+    text_splitter = resources.get("news_splitter")
     
-    # Fetch news using the Yahoo Finance tool
-    news_content = YahooFinanceNewsTool().run(query)
-    print("Fetched news content is called")
+    # Fetch news using the Yahoo Finance tool, reusing recent results for the same query
+    with telemetry.span("tool.yahoo_finance_news", query=query) as attrs:
+        try:
+            news_content = market_cache.get_or_fetch("news", query.strip().upper(), fetch_news, query)
+        except ValueError as e:
+            news_content = str(e)
+        attrs["bytes"] = len(news_content.encode("utf-8"))
+    telemetry.incr("bytes_fetched_total", attrs.get("bytes", 0), source="yahoo_news")
     # Split the news content into chunks
     try:
         chunks = text_splitter.split_text(news_content)
@@ -37,85 +55,287 @@ def yahoo_finance_news(query: str) -> List[str]:
 class FinanceData(BaseModel):
     tickers: List[str]
     time_range: str  
+    summary: bool = True
 
-@tool
-def get_data(request: dict) -> Dict[str, Any]:
-    
+# Concurrency settings for market data fetching
+MAX_FETCH_WORKERS = int(os.getenv("MAX_FETCH_WORKERS", "8"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))
+# Socket timeout of each Yahoo Finance HTTP request. FETCH_TIMEOUT only bounds how long
+# fetch_market_data waits; this is what stops a hung call and frees its worker thread.
+YF_REQUEST_TIMEOUT = float(os.getenv("YF_REQUEST_TIMEOUT", "10"))
+BATCH_HISTORY_MIN_TICKERS = 2
+
+# News prefetches get their own small pool so they never queue get_data's history,
+# price and option fetches behind them (or the other way around)
+NEWS_FETCH_WORKERS = int(os.getenv("NEWS_FETCH_WORKERS", "4"))
+
+# Shared bounded pools so concurrent callers can't open unlimited connections
+fetch_executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix="get_data")
+news_executor = ThreadPoolExecutor(max_workers=NEWS_FETCH_WORKERS, thread_name_prefix="news")
+
+
+def build_yf_session():
+    """curl_cffi session (the client yfinance itself uses) with a timeout on every request."""
+    from curl_cffi import requests as curl_requests
+    return curl_requests.Session(impersonate="chrome", timeout=YF_REQUEST_TIMEOUT)
+
+
+resources.register("yf_session", build_yf_session)
+
+
+def make_ticker(symbol: str):
+    """yf.Ticker on the timeout session; yfinance's own session when curl_cffi is missing."""
+    try:
+        return yf.Ticker(symbol, session=resources.get("yf_session"))
+    except ImportError:
+        return yf.Ticker(symbol)
+
+
+@telemetry.traced("yfinance.history")
+def fetch_history(ticker, time_range: str):
+    return ticker.history(period=time_range, timeout=YF_REQUEST_TIMEOUT)
+
+
+@telemetry.traced("yfinance.download")
+def fetch_batch_history(symbols: List[str], time_range: str) -> Dict[str, Any]:
+    """Downloads history for many tickers in one yf.download call. Symbols with no data are left out."""
+    frame = yf.download(
+        symbols,
+        period=time_range,
+        group_by="ticker",
+        threads=True,
+        progress=False,
+        auto_adjust=False,
+        timeout=YF_REQUEST_TIMEOUT,
+    )
+    histories = {}
+    top_level = set(frame.columns.get_level_values(0)) if frame.columns.nlevels > 1 else set()
+    for symbol in symbols:
+        if symbol in top_level:
+            histories[symbol] = frame[symbol].dropna(how="all")
+        elif not top_level and len(symbols) == 1:
+            histories[symbol] = frame.dropna(how="all")
+    return histories
+
+
+def get_histories(symbols: List[str], time_range: str, errors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     """
-    Retrieves historical stock data, current price, and options data for given tickers and time range.
-    Input format: {"tickers": ["MSFT", "AAPL"], "time_range": "1mo"}
+    Returns ticker -> history DataFrame, serving cached entries and fetching the misses
+    with a single batched download. Symbols with no data are left out; when a fetch
+    raises, the message is recorded in errors under each affected symbol.
     """
-    print("get_data called")
-    if not isinstance(request, dict):
-        return {"error": "Input must be a dict with 'tickers' and 'time_range'."}
-    
+    errors = {} if errors is None else errors
+    histories = {}
+    uncached = []
+    for symbol in symbols:
+        found, hist = market_cache.get("history", f"{symbol}:{time_range}")
+        if found:
+            histories[symbol] = hist
+        else:
+            uncached.append(symbol)
+
+    downloaded = {}
+    if len(uncached) >= BATCH_HISTORY_MIN_TICKERS:
+        try:
+            downloaded = fetch_batch_history(uncached, time_range)
+        except Exception as e:
+            errors.update({symbol: str(e) for symbol in uncached})
+    else:
+        for symbol in uncached:
+            try:
+                downloaded[symbol] = fetch_history(make_ticker(symbol), time_range)
+            except Exception as e:
+                errors[symbol] = str(e)
+
+    for symbol, hist in downloaded.items():
+        if hist is not None and not hist.empty:
+            market_cache.set("history", f"{symbol}:{time_range}", hist)
+            histories[symbol] = hist
+    return histories
+
+
+def indicator_summary(symbols: List[str], time_range: str = "6mo") -> str:
+    """Compact CSV of technical indicators for the given tickers, ready to drop into an LLM prompt."""
     try:
-        finance_request = FinanceData(**request)
+        histories = get_histories(list(dict.fromkeys(symbols)), time_range)
     except Exception as e:
-        return {"error": f"Invalid input: {str(e)}"}
+        print(f"Error fetching histories for indicators: {e}")
+        return ""
+    return format_indicator_summary(compute_indicators(histories))
+
+
+@telemetry.traced("yfinance.current_price")
+def fetch_current_price(ticker):
+    return ticker.fast_info.get("last_price") or ticker.info.get("regularMarketPrice", "N/A")
+
+
+@telemetry.traced("yfinance.options")
+def fetch_options(ticker):
+    if not ticker.options:
+        return "No options data available"
+    expiry = ticker.options[0]
+    chain = ticker.option_chain(expiry)
+    return {
+        "expiration_date": expiry,
+        "calls": chain.calls,
+        "puts": chain.puts
+    }
+
+
+def fetch_and_cache(namespace: str, key: str, fetch, *args):
+    value = fetch(*args)
+    market_cache.set(namespace, key, value)
+    return value
+
+
+def submit_cached(namespace: str, key: str, fetch, *args) -> Future:
+    """Resolves immediately on a cache hit, otherwise fetches on the pool and caches the result."""
+    found, value = market_cache.get(namespace, key)
+    if found:
+        future = Future()
+        future.set_result(value)
+        return future
+    return fetch_executor.submit(fetch_and_cache, namespace, key, fetch, *args)
+
+
+def collect_result(future, deadline: float, on_error):
+    """
+    Waits for a future until the shared deadline and converts failures with on_error.
+    The deadline only bounds the wait: a call that is already running can't be cancelled and
+    keeps its worker until YF_REQUEST_TIMEOUT ends it.
+    """
+    remaining = max(0.0, deadline - time.monotonic())
+    try:
+        return future.result(timeout=remaining), True
+    except FutureTimeout:
+        future.cancel()
+        return on_error(f"timed out after {FETCH_TIMEOUT}s"), False
+    except Exception as e:
+        return on_error(str(e)), False
+
+
+def fetch_market_data(finance_request: FinanceData) -> Dict[str, Any]:
+    """Fetches history, indicators, current price and options for every requested ticker."""
+    symbols = list(dict.fromkeys(finance_request.tickers))
+    deadline = time.monotonic() + FETCH_TIMEOUT
+    tickers = {symbol: make_ticker(symbol) for symbol in symbols}
+    time_range = finance_request.time_range
+
+    # Fan out every sub-request at once; history for all tickers is one batched task
+    history_errors: Dict[str, str] = {}
+    history_future = fetch_executor.submit(get_histories, symbols, time_range, history_errors)
+    price_futures = {
+        symbol: submit_cached("current_price", symbol, fetch_current_price, tickers[symbol])
+        for symbol in symbols
+    }
+    option_futures = {
+        symbol: submit_cached("options", symbol, fetch_options, tickers[symbol])
+        for symbol in symbols
+    }
+
+    histories, ok = collect_result(history_future, deadline, lambda e: e)
+    if ok:
+        history_errors = dict(history_errors)
+    else:
+        history_errors, histories = {symbol: histories for symbol in symbols}, {}
+    indicators = indicators_to_dict(compute_indicators(histories))
 
     data = {}
-    for symbol in finance_request.tickers:
-        ticker = yf.Ticker(symbol)
-        
+    for symbol in symbols:
+        missing = []
+
         # Historical data
-        try:
-            hist = ticker.history(period=finance_request.time_range)
-            hist_data = hist.to_dict()
-        except Exception as e:
-            hist_data = {"error": str(e)}
+        hist = histories.get(symbol)
+        if hist is not None:
+            hist_data = serialize_history(hist, finance_request.summary)
+        else:
+            error = history_errors.get(symbol)
+            hist_data = {"error": f"Error: {error}" if error else f"No history returned for {symbol}"}
+            missing.append("history")
 
         # Current price
-        try:
-            current_price = ticker.fast_info.get("last_price") or ticker.info.get("regularMarketPrice", "N/A")
-        except Exception as e:
-            current_price = f"Error: {str(e)}"
+        current_price, ok = collect_result(price_futures[symbol], deadline, lambda e: f"Error: {e}")
+        if not ok:
+            missing.append("current_price")
 
         # Options data
-        try:
-            if ticker.options:
-                expiry = ticker.options[0]
-                chain = ticker.option_chain(expiry)
-                options_data = {
-                    "expiration_date": expiry,
-                    "calls": chain.calls.to_dict(),
-                    "puts": chain.puts.to_dict()
-                }
-            else:
-                options_data = "No options data available"
-        except Exception as e:
-            options_data = f"Error: {str(e)}"
+        options_data, ok = collect_result(option_futures[symbol], deadline, lambda e: f"Error: {e}")
+        if ok:
+            options_data = serialize_options(options_data, current_price, finance_request.summary)
+        else:
+            missing.append("options")
 
         data[symbol] = {
             "history": hist_data,
+            "indicators": indicators.get(symbol, {}),
             "current_price": current_price,
             "options": options_data
         }
-    print("Data fetched successfully")
+        if missing:
+            data[symbol]["missing"] = missing
     return data
 
-# Define the Groq LLM
-groq_model = ChatGroq(
-    model_name="llama3-8b-8192",
-    groq_api_key=api_key,
-    max_retries=1
-)
-
-# Update the agent to include both tools
-agent = create_react_agent(
-    model=groq_model,
-    tools=[get_data, yahoo_finance_news],  
-    prompt="""You are a helpful financial assistant. When the user asks about a company or stock:
+
+@tool
+def get_data(request: dict) -> Dict[str, Any]:
+    
+    """
+    Retrieves historical stock data, current price, and options data for given tickers and time range.
+    Each ticker includes precomputed indicators (returns, volatility, SMA, RSI, MACD, drawdown,
+    volume anomalies). History and option chains are returned as compact column arrays. With "summary" (default true) long
+    histories are resampled to weekly/monthly bars and options are limited to near-the-money strikes.
+    Input format: {"tickers": ["MSFT", "AAPL"], "time_range": "1mo", "summary": true}
+    """
+    if not isinstance(request, dict):
+        return {"error": "Input must be a dict with 'tickers' and 'time_range'."}
+    
+    try:
+        finance_request = FinanceData(**request)
+    except Exception as e:
+        return {"error": f"Invalid input: {str(e)}"}
+
+    with telemetry.span("tool.get_data", tickers=finance_request.tickers, time_range=finance_request.time_range):
+        return fetch_market_data(finance_request)
+
+def build_news_splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+
+def build_yahoo_news_tool():
+    from langchain_community.tools.yahoo_finance_news import YahooFinanceNewsTool
+    return YahooFinanceNewsTool()
+
+
+def build_agent():
+    from langgraph.prebuilt import create_react_agent
+
+    # Update the agent to include both tools; the model is the shared llama3-8b-8192 client
+    return create_react_agent(
+        model=resources.get_llm(),
+        tools=[get_data, yahoo_finance_news],  
+        prompt="""You are a helpful financial assistant. When the user asks about a company or stock:
 1.Use the yahoo_finance_news tool to fetch and summarize the latest news in concise chunks.
 2.Use the get_data tool to retrieve real-time stock prices and historical performance (e.g., daily, weekly, monthly).
 3.Present data in a readable, human-friendly format, including stock price trends, volume changes, and key metrics.
 4.Clearly label the timeframe for historical data and highlight notable events or shifts.
 5.Keep summaries clear, focused, and concise for quick understanding."""
-)
+    )
+
+
+resources.register("news_splitter", build_news_splitter)
+resources.register("yahoo_news_tool", build_yahoo_news_tool)
+resources.register("finance_agent", build_agent)
+
 
-def run_financial_assistant(user_prompt: str):
+def build_assistant_prompt(user_prompt: str) -> str:
     # Modify the prompt inline with required instructions
-    modified_prompt = f"""
+    return f"""
 You are a helpful financial assistant.
 
 The user has asked: "{user_prompt}"
@@ -130,15 +350,138 @@ Instructions:
 - Keep responses clear, concise, and easy to interpret.
 """
 
+
+# "auto" uses the prefetch plan whenever tickers can be resolved up front, "fast" and
+# "react" force one path (fast still falls back to ReAct when no ticker is found)
+ASSISTANT_MODE = os.getenv("ASSISTANT_MODE", "auto")
+NEWS_CHUNKS_PER_TICKER = 6
+# Smallest yfinance period covering a requested look-back (days)
+TIME_RANGES = [(5, "5d"), (31, "1mo"), (92, "3mo"), (183, "6mo"), (366, "1y"), (731, "2y"), (1827, "5y")]
+
+
+def infer_time_range(user_prompt: str, default: str = "1mo") -> str:
+    time_from = extract_time_from(user_prompt)
+    if not time_from:
+        return default
+    try:
+        start = datetime.strptime(time_from, "%Y%m%dT%H%M").replace(tzinfo=timezone.utc)
+    except ValueError:
+        # Matches the date pattern but isn't a real date (e.g. 2025-02-30); same default as the scraper
+        start = datetime.strptime(get_default_time_from(), "%Y%m%dT%H%M").replace(tzinfo=timezone.utc)
+    days = (datetime.now(timezone.utc) - start).days
+    for max_days, period in TIME_RANGES:
+        if days <= max_days:
+            return period
+    return "max"
+
+
+def prefetch_market_context(tickers: List[str], time_range: str):
+    """Runs get_data and yahoo_finance_news for every ticker at the same time. Returns (data, news)."""
+    news_futures = {symbol: news_executor.submit(yahoo_finance_news.invoke, symbol) for symbol in tickers}
+    data = get_data.invoke({"request": {"tickers": tickers, "time_range": time_range}})
+    news = {}
+    for symbol, future in news_futures.items():
+        try:
+            news[symbol] = future.result(timeout=FETCH_TIMEOUT)[:NEWS_CHUNKS_PER_TICKER]
+        except Exception as e:
+            news[symbol] = [f"Error fetching news: {e}"]
+    return data, news
+
+
+def build_fast_prompt(user_prompt: str, time_range: str, data: Dict[str, Any], news: Dict[str, List[str]]) -> str:
+    market = {}
+    for symbol, values in data.items():
+        if not isinstance(values, dict):
+            market[symbol] = values
+            continue
+        options = values.get("options")
+        market[symbol] = {
+            "current_price": values.get("current_price"),
+            "indicators": values.get("indicators"),
+            "options_expiration": options.get("expiration_date") if isinstance(options, dict) else options,
+            "missing": values.get("missing"),
+        }
+    news_text = "\n".join(f"[{symbol}] {chunk}" for symbol, chunks in news.items() for chunk in chunks)
+    return f"""
+You are a helpful financial assistant.
+
+The user has asked: "{user_prompt}"
+
+Market data ({time_range}; indicators are precomputed, percentages in %):
+{json.dumps(market, default=str)}
+
+Latest news:
+{news_text}
+
+Instructions:
+- In 500 words
+- Summarize the latest related news in concise chunks.
+- Present stock prices, trends, volume, and key metrics in a clear, human-readable format.
+- Highlight any important market events or sudden changes.
+- Ensure the timeframe is mentioned when showing historical data.
+- Keep responses clear, concise, and easy to interpret.
+"""
+
+
+def plan_fast_prompt(user_prompt: str, mode: str):
+    """Returns the single-call prompt for the prefetch plan, or None when the ReAct loop should run."""
+    if mode == "react":
+        return None
+    tickers = extract_tickers(user_prompt)
+    if not tickers:
+        if mode == "fast":
+            print("No tickers resolved from the prompt, falling back to the ReAct agent")
+        return None
+    time_range = infer_time_range(user_prompt)
+    data, news = prefetch_market_context(tickers, time_range)
+    return build_fast_prompt(user_prompt, time_range, data, news)
+
+
+def run_financial_assistant(user_prompt: str, mode: str = ASSISTANT_MODE, callbacks: list = None):
+    """
+    Answers a market question. When tickers can be resolved up front both tools run in
+    parallel and one LLM call writes the answer; otherwise the ReAct agent decides which
+    tools to call, one LLM turn per call.
+    """
+    config = {"callbacks": callbacks} if callbacks else None
+    fast_prompt = plan_fast_prompt(user_prompt, mode)
+    if fast_prompt is not None:
+        return resources.get_llm().invoke(fast_prompt, config=config).content
+
+    modified_prompt = build_assistant_prompt(user_prompt)
+
     # Run the agent
-    response = agent.invoke({
+    response = resources.get("finance_agent").invoke({
         "messages": [{"role": "user", "content": modified_prompt}]
-    })
+    }, config=config)
 
     # Output the final response
     return (response["messages"][-1].content)
 
 
+def stream_financial_assistant(user_prompt: str, mode: str = ASSISTANT_MODE) -> Iterator[str]:
+    """
+    Streams the assistant's answer token by token. Tool-calling turns produce no text,
+    so only the model's prose is yielded.
+    """
+    fast_prompt = plan_fast_prompt(user_prompt, mode)
+    if fast_prompt is not None:
+        for chunk in resources.get_llm().stream(fast_prompt):
+            if chunk.content:
+                yield chunk.content
+        return
+
+    modified_prompt = build_assistant_prompt(user_prompt)
+    for message, metadata in resources.get("finance_agent").stream(
+        {"messages": [{"role": "user", "content": modified_prompt}]},
+        stream_mode="messages",
+    ):
+        if metadata.get("langgraph_node") != "agent":
+            continue
+        if isinstance(message.content, str) and message.content:
+            yield message.content
+
+
 if __name__ == "__main__":
     user_input = "What happened today with Microsoft stocks?"
     print(run_financial_assistant(user_input))
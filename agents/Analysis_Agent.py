@@ -3,24 +3,48 @@ from dotenv import load_dotenv
 load_dotenv()
 import os
 api_key = os.getenv("GROQ_API_KEY")
-from langchain_groq import ChatGroq
-def Analysis(chunks: list[str]) -> None:
-    document =""
-    for doc in chunks:
-        document += doc
-    llm = ChatGroq(
-    model="llama3-8b-8192",
-    groq_api_key=api_key,
-)
+from typing import Any, Iterator, List, Optional
+from agents import resources
+from agents.context_packer import context_budget, pack_context
+def build_analysis_prompt(chunks: List[Any], tickers: Optional[List[str]] = None, time_range: str = "6mo") -> str:
+    """
+    chunks can be strings or (Document, score) pairs from search_chunks; they are packed
+    into whatever room the template and indicators leave in the context window.
+    """
+    # Precomputed indicators replace raw price rows so the model doesn't do the arithmetic
+    indicators = ""
+    if tickers:
+        from agents.API_Agent import indicator_summary
+        indicators = indicator_summary(tickers, time_range)
 
     prompt_tamplet = """
     Provide intelligent stock market reporrt on {document}
-    
-"""  
-    response = llm.invoke(prompt_tamplet)
+
+"""
+    indicator_block = ""
+    if indicators:
+        indicator_block = f"""
+    Use these precomputed technical indicators ({time_range}, percentages in %) instead of recomputing them:
+{indicators}
+"""
+    document = pack_context(chunks, context_budget(prompt_tamplet + indicator_block))
+    return prompt_tamplet.format(document=document) + indicator_block
+
+
+def Analysis(chunks: List[Any], tickers: Optional[List[str]] = None, time_range: str = "6mo") -> str:
+    llm = resources.get_llm()
+    response = llm.invoke(build_analysis_prompt(chunks, tickers, time_range))
     return response.content
 
 
+def stream_analysis(chunks: List[Any], tickers: Optional[List[str]] = None, time_range: str = "6mo") -> Iterator[str]:
+    """Same report as Analysis, yielded token by token as the model generates it."""
+    llm = resources.get_llm()
+    for chunk in llm.stream(build_analysis_prompt(chunks, tickers, time_range)):
+        if chunk.content:
+            yield chunk.content
+
+
 
 
 if __name__ == "__main__":
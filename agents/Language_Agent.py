@@ -1,12 +1,15 @@
 from dotenv import load_dotenv
 import os
-from langchain_groq import ChatGroq
 from langchain.prompts import PromptTemplate
+from agents import resources
+from agents.context_packer import context_budget, pack_context
+from typing import Iterator, List, Optional
 
 # Load environment variables from .env file
 load_dotenv()
 
-def language(chunks: str) -> str:
+def build_language_request(chunks: str, tickers: Optional[List[str]] = None, time_range: str = "6mo"):
+    """Validates the input and returns (llm, formatted prompt)."""
     # Retrieve the Groq API key
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
@@ -16,31 +19,58 @@ def language(chunks: str) -> str:
     if not chunks or not isinstance(chunks, str):
         raise ValueError("Input chunks must be a non-empty string.")
 
-    # Initialize the Groq LLM
-    llm = ChatGroq(
-        model="llama3-8b-8192",
-        groq_api_key=api_key,
-    )
+    # Shared Groq LLM client, built on first use
+    llm = resources.get_llm()
+
+    # Precomputed indicators replace raw price rows so the model doesn't do the arithmetic
+    indicators = "Not available."
+    if tickers:
+        from agents.API_Agent import indicator_summary
+        indicators = indicator_summary(tickers, time_range) or indicators
 
     # Define the prompt template
     prompt_template = PromptTemplate(
-        input_variables=["chunks"],
+        input_variables=["chunks", "indicators", "time_range"],
         template="""
         You are a financial analyst. Provide an intelligent and concise stock market report based on the following data:
 
         {chunks}
 
+        Precomputed technical indicators ({time_range}, percentages in %), use them instead of recomputing:
+        {indicators}
+
         The report should summarize key insights, trends, or actionable information in a clear and professional manner.
         """
     )
 
+    # Fit the input into the context window, keeping its order; oversized inputs get summarized
+    reserved = prompt_template.format(chunks="", indicators=indicators, time_range=time_range)
+    chunks = pack_context([chunks], context_budget(reserved), keep_order=True)
+    return llm, prompt_template.format(chunks=chunks, indicators=indicators, time_range=time_range)
+
+
+def language(chunks: str, tickers: Optional[List[str]] = None, time_range: str = "6mo") -> str:
+    llm, prompt = build_language_request(chunks, tickers, time_range)
+
     # Generate the report using the LLM
     try:
-        response = llm.invoke(prompt_template.format(chunks=chunks))
+        response = llm.invoke(prompt)
         return response.content
     except Exception as e:
         raise Exception(f"Error generating report: {str(e)}")
 
+
+def stream_language(chunks: str, tickers: Optional[List[str]] = None, time_range: str = "6mo") -> Iterator[str]:
+    """Same report as language, yielded token by token as the model generates it."""
+    llm, prompt = build_language_request(chunks, tickers, time_range)
+
+    try:
+        for chunk in llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+    except Exception as e:
+        raise Exception(f"Error generating report: {str(e)}")
+
 # Example usage
 if __name__ == "__main__":
     sample_chunks = """
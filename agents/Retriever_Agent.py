@@ -1,47 +1,377 @@
 
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
-from langchain_chroma import Chroma
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from datetime import datetime
+from agents.embedding_cache import EmbeddingCache, content_hash
+from agents.answer_cache import invalidate_for_ingest
+from agents.embedding_backends import EMBEDDING_BACKEND, build_embeddings as build_backend_embeddings, collection_name, model_id
+from agents import resources, telemetry
+import os
+import threading
+import time
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))
+# Documents not re-ingested within this many seconds are expired (0 disables expiry)
+DOC_TTL_SECONDS = float(os.getenv("DOC_TTL_SECONDS", str(14 * 24 * 3600)))
+# Ingestion sweeps expired documents at most this often (seconds)
+DOC_EXPIRE_INTERVAL = float(os.getenv("DOC_EXPIRE_INTERVAL", "600"))
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "chroma_langchain_db")
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", os.path.join(VECTOR_STORE_DIR, "embedding_cache.sqlite3"))
+
+
+# Cosine distance, so search scores are cosine similarities in [0, 1] for MiniLM vectors.
+# "collection" is the original L2-distance collection, migrated on first use. Backends
+# other than "hf" get their own collection (e.g. collection_cosine_onnx-int8).
+COLLECTION_NAME = collection_name("collection_cosine", EMBEDDING_BACKEND)
+LEGACY_COLLECTION_NAME = "collection"
 
 
 model_name = "sentence-transformers/all-MiniLM-L6-v2"
 model_kwargs = {"device": "cpu"}
 encode_kwargs = {"normalize_embeddings": True}
-hf = HuggingFaceEmbeddings(
-model_name=model_name, model_kwargs=model_kwargs, encode_kwargs=encode_kwargs
-)   
 
 
-vector_store = Chroma(
-collection_name="collection",
-embedding_function=hf,
-persist_directory="chroma_langchain_db",
+# The MiniLM model (torch or ONNX Runtime, per EMBEDDING_BACKEND) and the Chroma store
+# are loaded on first use, not at import
+def build_embeddings():
+    return build_backend_embeddings(model_name, model_kwargs, encode_kwargs)
+
+
+def build_vector_store(persist_directory: str = VECTOR_STORE_DIR):
+    from langchain_chroma import Chroma
+    store = Chroma(
+    collection_name=COLLECTION_NAME,
+    embedding_function=resources.get("embeddings"),
+    persist_directory=persist_directory,
+    collection_metadata={"hnsw:space": "cosine"},
 )
+    # The legacy collection holds sentence-transformers vectors
+    if EMBEDDING_BACKEND == "hf":
+        migrate_legacy_collection(store)
+    return store
+
+
+def migrate_legacy_collection(store, batch_size: int = 1000) -> None:
+    """
+    Moves chunks from the old L2-distance collection into the cosine one, once. The stored
+    vectors are reused as they are; only the index metric changes. Chunks from before
+    ingestion timestamps existed are dated by the migration, so they expire and match
+    date windows like newly ingested ones.
+    """
+    client = store._client
+    try:
+        legacy = client.get_collection(LEGACY_COLLECTION_NAME)
+    except Exception:
+        return
+    migrated_at = time.time()
+    while True:
+        batch = legacy.get(limit=batch_size, include=["embeddings", "documents", "metadatas"])
+        if not batch["ids"]:
+            break
+        metadatas = []
+        for metadata in batch["metadatas"]:
+            metadata = dict(metadata or {})
+            metadata.setdefault("ingested_at", migrated_at)
+            metadata.setdefault("published_at", metadata["ingested_at"])
+            metadatas.append(metadata)
+        store._collection.upsert(
+            ids=batch["ids"], embeddings=batch["embeddings"], documents=batch["documents"], metadatas=metadatas
+        )
+        legacy.delete(ids=batch["ids"])
+    client.delete_collection(LEGACY_COLLECTION_NAME)
+    print(f"Migrated the vector store to the cosine collection {COLLECTION_NAME!r}")
+
+
+def build_embedding_cache():
+    cache = EmbeddingCache(EMBEDDING_CACHE_DB, model_id(model_name, EMBEDDING_BACKEND))
+    telemetry.register_collector("embedding_cache", cache.stats)
+    return cache
+
+
+resources.register("embeddings", build_embeddings)
+resources.register("vector_store", build_vector_store)
+resources.register("embedding_cache", build_embedding_cache)
+
+
+def get_embeddings():
+    return resources.get("embeddings")
+
+
+def get_vector_store():
+    return resources.get("vector_store")
 
 
-def embed_chunks(chunks: list[str]) -> None:
+def get_embedding_cache() -> EmbeddingCache:
+    return resources.get("embedding_cache")
+
+
+def to_document(chunk: Union[str, Document]) -> Document:
+    if isinstance(chunk, Document):
+        return chunk
+    return Document(page_content=str(chunk))
+
+
+def chunk_metadata(metadata: Optional[Dict[str, Any]], ingested_at: float) -> Dict[str, Any]:
+    """
+    Flattens chunk metadata into Chroma-compatible scalars. A "tickers" list becomes a
+    comma-separated string plus one ticker_<SYMBOL> flag per symbol so it can be filtered on.
+    """
+    flat = {}
+    for key, value in (metadata or {}).items():
+        if value is None:
+            continue
+        if key == "tickers":
+            symbols = [value] if isinstance(value, str) else list(value)
+            symbols = [s.strip().upper() for s in symbols if s and s.strip()]
+            if not symbols:
+                continue
+            flat["tickers"] = ",".join(symbols)
+            for symbol in symbols:
+                flat[f"ticker_{symbol}"] = True
+        elif isinstance(value, (str, int, float, bool)):
+            flat[key] = value
+        else:
+            flat[key] = str(value)
+    flat["ingested_at"] = ingested_at
+    # Chunks without a publication time are dated by ingestion so date windows always apply
+    flat.setdefault("published_at", ingested_at)
+    return flat
+
+
+def upsert_batch(documents: List[Document]) -> int:
+    """
+    Writes a batch to Chroma under content-hash ids. Chunks already in the store only get
+    their metadata refreshed; new chunks are encoded in one embed_documents call unless
+    their vector is already in the embedding cache.
+
+    Returns:
+        int: Number of chunks newly added to the store
+    """
+    unique = {}
+    for doc in documents:
+        if doc.page_content.strip():
+            unique.setdefault(content_hash(doc.page_content), doc)
+    if not unique:
+        return 0
+
+    ids = list(unique)
+    now = time.time()
+    metadatas = {doc_id: chunk_metadata(unique[doc_id].metadata, now) for doc_id in ids}
+    collection = get_vector_store()._collection
+
+    existing = set(collection.get(ids=ids, include=[])["ids"])
+    if existing:
+        collection.update(ids=list(existing), metadatas=[metadatas[doc_id] for doc_id in existing])
+
+    new_ids = [doc_id for doc_id in ids if doc_id not in existing]
+    if not new_ids:
+        return 0
+    vectors = get_embedding_cache().get_many(new_ids)
+    to_encode = [doc_id for doc_id in new_ids if doc_id not in vectors]
+    if to_encode:
+        texts = [unique[doc_id].page_content for doc_id in to_encode]
+        with telemetry.span("embed.encode", chunks=len(texts)):
+            encoded = dict(zip(to_encode, get_embeddings().embed_documents(texts)))
+        telemetry.incr("chunks_embedded_total", len(texts))
+        get_embedding_cache().set_many(encoded)
+        vectors.update(encoded)
+
+    with telemetry.span("chroma.upsert", chunks=len(new_ids)):
+        collection.upsert(
+            ids=new_ids,
+            embeddings=[vectors[doc_id] for doc_id in new_ids],
+            documents=[unique[doc_id].page_content for doc_id in new_ids],
+            metadatas=[metadatas[doc_id] for doc_id in new_ids],
+        )
+    # Cached answers about these tickers predate the new articles
+    invalidate_for_ingest([metadatas[doc_id] for doc_id in new_ids])
+    return len(new_ids)
+
+
+def ingested_sources(sources: List[str]) -> set:
+    """Returns the subset of sources (e.g. article URLs) that already have chunks in the store."""
+    sources = list(dict.fromkeys(s for s in sources if s))
+    if not sources:
+        return set()
+    found = get_vector_store()._collection.get(where={"source": {"$in": sources}}, include=["metadatas"])
+    return {metadata.get("source") for metadata in found["metadatas"] if metadata}
+
+
+_expire_lock = threading.Lock()
+_last_expired_at: Optional[float] = None
+
+
+def expire_documents(max_age_seconds: float = DOC_TTL_SECONDS, min_interval: float = DOC_EXPIRE_INTERVAL) -> bool:
+    """
+    Deletes chunks that have not been (re-)ingested within max_age_seconds. The delete scans
+    the whole collection, so it runs at most once per min_interval seconds; returns whether it ran.
+    """
+    global _last_expired_at
+    if max_age_seconds <= 0:
+        return False
+    with _expire_lock:
+        now = time.monotonic()
+        if _last_expired_at is not None and now - _last_expired_at < min_interval:
+            return False
+        _last_expired_at = now
+    cutoff = time.time() - max_age_seconds
+    get_vector_store()._collection.delete(where={"ingested_at": {"$lt": cutoff}})
+    return True
+
+
+def embed_chunk_stream(
+    chunks: Iterable[Union[str, Document]],
+    batch_size: int = EMBED_BATCH_SIZE,
+    metadata: Optional[Dict[str, Any]] = None,
+    on_complete: Optional[Callable[[], None]] = None,
+) -> int:
+    """
+    Embeds chunks from any iterable (e.g. a generator fed by a scraper) in batches,
+    so ingestion starts before the producer has finished.
+
+    Args:
+        chunks (Iterable[str | Document]): Text chunks or Documents to embed
+        batch_size (int): Number of chunks encoded and written per batch
+        metadata (dict): Defaults (ticker, source, published_at...) merged under each chunk's own metadata
+        on_complete (callable): Called once every chunk is stored (e.g. to commit news watermarks)
+
+    Returns:
+        int: Number of chunks newly stored
+    """
+    stored = 0
+    batch = []
+    for chunk in chunks:
+        document = to_document(chunk)
+        if metadata:
+            document = Document(page_content=document.page_content, metadata={**metadata, **document.metadata})
+        batch.append(document)
+        if len(batch) >= batch_size:
+            stored += upsert_batch(batch)
+            batch = []
+    if batch:
+        stored += upsert_batch(batch)
+    if on_complete:
+        on_complete()
+    expire_documents()
+    return stored
+
+
+def embed_chunks(
+    chunks: list[str],
+    batch_size: int = EMBED_BATCH_SIZE,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> None:
     """
     Embeds a list of text chunks and stores them in the Chroma vector store.
+    Chunks are keyed by content hash, so re-ingesting the same text never duplicates it.
     
     Args:
-        chunks (list[str]): List of text chunks to embed
-        doc_id (str): Document identifier
-        user_id (str): User identifier
-    """
-    for i, chunk in enumerate(chunks):
-        
-        document = Document(
-            page_content=chunk,
+        chunks (list[str | Document]): List of text chunks or Documents to embed
+        batch_size (int): Number of chunks encoded and written per batch
+        metadata (dict): Defaults (ticker, source, published_at...) applied to every chunk
+    """
+    embed_chunk_stream(chunks, batch_size, metadata)
+
+def to_timestamp(value: Union[datetime, float, int, None]) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def build_filter(
+    tickers: Optional[List[str]] = None,
+    since: Union[datetime, float, None] = None,
+    until: Union[datetime, float, None] = None,
+    source_type: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Builds a Chroma where clause from ticker, published_at window and source type."""
+    conditions = []
+    if tickers:
+        flags = [{f"ticker_{t.strip().upper()}": True} for t in tickers if t.strip()]
+        if len(flags) == 1:
+            conditions.append(flags[0])
+        elif flags:
+            conditions.append({"$or": flags})
+    if since is not None:
+        conditions.append({"published_at": {"$gte": to_timestamp(since)}})
+    if until is not None:
+        conditions.append({"published_at": {"$lte": to_timestamp(until)}})
+    if source_type:
+        conditions.append({"source_type": source_type})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def search_chunks(
+    query: str,
+    k: int = RETRIEVAL_K,
+    tickers: Optional[List[str]] = None,
+    since: Union[datetime, float, None] = None,
+    until: Union[datetime, float, None] = None,
+    source_type: Optional[str] = None,
+    search_type: str = "similarity",
+    score_threshold: Optional[float] = None,
+    fetch_k: int = 20,
+    lambda_mult: float = 0.5,
+) -> List[Tuple[Document, Optional[float]]]:
+    """
+    Searches the vector store restricted by metadata filters.
+
+    Args:
+        query (str): Search query
+        k (int): Number of chunks to return
+        tickers (list[str]): Only chunks tagged with one of these tickers
+        since, until (datetime | float): Window on the chunk's published_at (epoch seconds)
+        source_type (str): e.g. "article", "news", "assistant"
+        search_type (str): "similarity", "mmr" (diverse results) or "threshold"
+        score_threshold (float): Minimum relevance score in [0, 1] for "threshold"
+        fetch_k (int): Candidates considered by MMR before re-ranking
+        lambda_mult (float): MMR trade-off between relevance (1) and diversity (0)
+
+    Returns:
+        list[tuple[Document, float | None]]: Documents with relevance scores (None for MMR)
+    """
+    with telemetry.span("chroma.search", search_type=search_type, k=k):
+        return _search(query, k, build_filter(tickers, since, until, source_type), search_type,
+                       score_threshold, fetch_k, lambda_mult)
+
+
+def _search(query, k, where, search_type, score_threshold, fetch_k, lambda_mult):
+    if search_type == "mmr":
+        docs = get_vector_store().max_marginal_relevance_search(
+            query, k=k, fetch_k=max(fetch_k, k), lambda_mult=lambda_mult, filter=where
         )
-        vector_store.add_documents([document])
+        return [(doc, None) for doc in docs]
+    if search_type not in ("similarity", "threshold"):
+        raise ValueError(f"Unknown search_type: {search_type}")
+    results = [
+        (doc, relevance_score(distance))
+        for doc, distance in get_vector_store().similarity_search_with_score(query, k=k, filter=where)
+    ]
+    if search_type == "threshold":
+        results = [(doc, score) for doc, score in results if score >= (score_threshold or 0.0)]
+    return results
 
-def get_chunks(query:str):
-    results = vector_store.similarity_search(
-    query,
-    k=5
-)
+
+def relevance_score(distance: float) -> float:
+    """Cosine distance to similarity, clipped to [0, 1] (anti-correlated text scores 0)."""
+    return min(1.0, max(0.0, 1.0 - distance))
+
+
+def get_chunks(query: str, k: int = RETRIEVAL_K, **filters) -> List[str]:
+    """
+    Returns the text of the chunks most relevant to query. Accepts the same
+    filter and search options as search_chunks (tickers, since, until, source_type, search_type...).
+    """
+    results = search_chunks(query, k=k, **filters)
     list_of_chunks=[]
-    for res in results:
+    for res, _ in results:
         list_of_chunks.append(res.page_content)
     return list_of_chunks
 
@@ -1,28 +1,345 @@
 import os
+import re
+import hashlib
+import threading
+import time
+import uuid
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
+import numpy as np
 import speech_recognition as sr
-from gtts import gTTS
+from agents import resources
 
 load_dotenv()
 
-def voice_to_text(audio_path: str) -> str:
-    recognizer = sr.Recognizer()
-    with sr.AudioFile(audio_path) as source:
-        audio = recognizer.record(source)
+# Speech-to-text settings
+STT_BACKEND = os.getenv("STT_BACKEND", "google")
+STT_WORKERS = int(os.getenv("STT_WORKERS", "4"))
+VAD_WINDOW_MS = 30
+VAD_SILENCE_MS = 600
+VAD_MIN_SPEECH_MS = 250
+VAD_MAX_SEGMENT_SECONDS = 15
+VAD_MIN_RMS = 300
+VAD_NOISE_RATIO = 3.0
+SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+# 24-bit WAVs have no numpy dtype; their samples are unpacked into int32
+SAMPLE_WIDTHS = (1, 2, 3, 4)
+
+
+class GoogleRecognizerBackend:
+    """Google Web Speech API (network)."""
+    name = "google"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio: "sr.AudioData") -> str:
+        return self.recognizer.recognize_google(audio)
+
+
+class SphinxRecognizerBackend:
+    """CMU PocketSphinx, runs fully offline (requires the pocketsphinx package)."""
+    name = "sphinx"
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio: "sr.AudioData") -> str:
+        return self.recognizer.recognize_sphinx(audio)
+
+
+STT_BACKENDS = {"google": GoogleRecognizerBackend, "sphinx": SphinxRecognizerBackend}
+resources.register("stt_backend", lambda: STT_BACKENDS[STT_BACKEND]())
+
+
+def decode_samples(frames: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 3:
+        # Little-endian 3-byte samples go in the top bytes of an int32, the shift restores the sign
+        padded = np.zeros((len(frames) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        return padded.view("<i4").ravel() >> 8
+    return np.frombuffer(frames, dtype=SAMPLE_DTYPES[sample_width])
+
+
+def encode_samples(samples: np.ndarray, sample_width: int) -> bytes:
+    if sample_width == 3:
+        return samples.astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return samples.astype(SAMPLE_DTYPES[sample_width]).tobytes()
 
+
+def window_rms(frames: bytes, sample_width: int, channels: int) -> float:
+    """RMS energy in 16-bit sample units, so VAD_MIN_RMS means the same at every sample width."""
+    samples = decode_samples(frames, sample_width).astype(np.float64)
+    if sample_width == 1:
+        samples -= 128
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    samples *= 2.0 ** (16 - 8 * sample_width)
+    return float(np.sqrt(np.mean(samples ** 2))) if samples.size else 0.0
+
+
+def to_mono(frames: bytes, sample_width: int, channels: int) -> bytes:
+    if channels == 1:
+        return frames
+    samples = decode_samples(frames, sample_width).reshape(-1, channels).mean(axis=1)
+    return encode_samples(samples, sample_width)
+
+
+def iter_voice_segments(audio_path: str) -> Iterator["sr.AudioData"]:
+    """
+    Reads a WAV file in VAD_WINDOW_MS windows (never the whole file at once) and yields one
+    AudioData per utterance. An utterance ends after VAD_SILENCE_MS of windows whose RMS
+    energy is under an adaptive threshold, or after VAD_MAX_SEGMENT_SECONDS.
+    """
+    with wave.open(audio_path, "rb") as wav:
+        rate, width, channels = wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+        if width not in SAMPLE_WIDTHS:
+            raise ValueError(f"Unsupported sample width: {width}")
+        frames_per_window = max(1, rate * VAD_WINDOW_MS // 1000)
+        silence_windows = VAD_SILENCE_MS // VAD_WINDOW_MS
+        min_speech_windows = VAD_MIN_SPEECH_MS // VAD_WINDOW_MS
+        max_windows = VAD_MAX_SEGMENT_SECONDS * 1000 // VAD_WINDOW_MS
+
+        noise_floor = None
+        segment: List[bytes] = []
+        speech_windows = 0
+        trailing_silence = 0
+        while True:
+            frames = wav.readframes(frames_per_window)
+            if not frames:
+                break
+            rms = window_rms(frames, width, channels)
+            threshold = max(VAD_MIN_RMS, (noise_floor or 0) * VAD_NOISE_RATIO)
+            if rms >= threshold:
+                segment.append(frames)
+                speech_windows += 1
+                trailing_silence = 0
+            else:
+                noise_floor = rms if noise_floor is None else 0.95 * noise_floor + 0.05 * rms
+                if segment:
+                    segment.append(frames)
+                    trailing_silence += 1
+            if segment and (trailing_silence >= silence_windows or len(segment) >= max_windows):
+                if speech_windows >= min_speech_windows:
+                    yield sr.AudioData(to_mono(b"".join(segment), width, channels), rate, width)
+                segment, speech_windows, trailing_silence = [], 0, 0
+        if segment and speech_windows >= min_speech_windows:
+            yield sr.AudioData(to_mono(b"".join(segment), width, channels), rate, width)
+
+
+def wav_sample_width(audio_path: str) -> int:
+    with wave.open(audio_path, "rb") as wav:
+        return wav.getsampwidth()
+
+
+def transcribe_segment(audio: "sr.AudioData", backend) -> str:
     try:
-        return recognizer.recognize_google(audio)
+        return backend.transcribe(audio)
     except sr.UnknownValueError:
-        return "Could not understand audio."
+        return ""
+
+
+def stream_voice_to_text(audio_path: str, backend=None, workers: int = STT_WORKERS) -> Iterator[str]:
+    """
+    Transcribes a recording utterance by utterance: segments are sent to the recognizer
+    concurrently while the file is still being read, and the stitched transcript so far is
+    yielded after each segment (in order), so callers can act on partial text early.
+    Non-WAV inputs, and WAVs with a sample width the VAD can't read, fall back to a
+    single whole-file recognition.
+
+    Raises:
+        sr.RequestError: If the recognizer backend can't be reached
+    """
+    backend = backend or resources.get("stt_backend")
+    if not audio_path.lower().endswith(".wav") or wav_sample_width(audio_path) not in SAMPLE_WIDTHS:
+        with sr.AudioFile(audio_path) as source:
+            audio = sr.Recognizer().record(source)
+        yield transcribe_segment(audio, backend)
+        return
+
+    parts: List[str] = []
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt") as pool:
+        for segment in iter_voice_segments(audio_path):
+            pending.append(pool.submit(transcribe_segment, segment, backend))
+            # Emit finished leading segments without waiting for the rest of the file
+            while pending and pending[0].done():
+                text = pending.popleft().result()
+                if text:
+                    parts.append(text.strip())
+                    yield " ".join(parts)
+        while pending:
+            text = pending.popleft().result()
+            if text:
+                parts.append(text.strip())
+                yield " ".join(parts)
+
+
+def voice_to_text(audio_path: str) -> str:
+    transcript = ""
+    try:
+        for transcript in stream_voice_to_text(audio_path):
+            pass
     except sr.RequestError as e:
         return f"API request error: {e}"
+    except (ValueError, wave.Error, EOFError) as e:
+        return f"Could not read audio: {e}"
+    return transcript or "Could not understand audio."
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Text-to-speech settings
+TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+TTS_OUTPUT_DIR = os.getenv("TTS_OUTPUT_DIR", "./output")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(TTS_OUTPUT_DIR, "tts_cache"))
+# Per-request audio files in TTS_OUTPUT_DIR are deleted this many seconds after they were written (0 keeps them)
+TTS_OUTPUT_TTL = float(os.getenv("TTS_OUTPUT_TTL", "3600"))
+# Short sentences are grouped into segments of up to this many characters
+MAX_SEGMENT_CHARS = 300
+
+
+class GTTSBackend:
+    """Google Translate TTS (network), writes MP3."""
+    name = "gtts"
+    extension = "mp3"
+
+    def synthesize(self, text: str, output_path: str) -> None:
+        from gtts import gTTS
+        gTTS(text=text, lang='en').save(output_path)
+
+
+class Pyttsx3Backend:
+    """Local offline engine (SAPI5/NSSpeech/eSpeak), writes WAV. The engine is not thread-safe."""
+    name = "pyttsx3"
+    extension = "wav"
+
+    def __init__(self):
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def synthesize(self, text: str, output_path: str) -> None:
+        with self._lock:
+            if self._engine is None:
+                import pyttsx3
+                self._engine = pyttsx3.init()
+            self._engine.save_to_file(text, output_path)
+            self._engine.runAndWait()
+
+
+TTS_BACKENDS = {"gtts": GTTSBackend, "pyttsx3": Pyttsx3Backend}
+resources.register("tts_backend", lambda: TTS_BACKENDS[TTS_BACKEND]())
 
-def text_to_voice(text: str, output_path: str = "./output/output_speech.mp3") -> str:
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    tts = gTTS(text=text, lang='en')
-    tts.save(output_path)
+
+def pop_sentences(buffer: str) -> Tuple[List[str], str]:
+    """Splits streamed text into complete sentences and the unfinished remainder."""
+    parts = SENTENCE_END.split(buffer)
+    return [p.strip() for p in parts[:-1] if p.strip()], parts[-1]
+
+
+def split_sentences(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> List[str]:
+    """Splits text into sentence-aligned segments, grouping short sentences up to max_chars."""
+    segments = []
+    current = ""
+    for sentence in SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        segments.append(current)
+    return segments
+
+
+def synthesize_segment(text: str, backend=None) -> str:
+    """
+    Synthesizes one segment, reusing the cached file for identical text.
+
+    Returns:
+        str: Path of the audio file in the TTS cache
+    """
+    backend = backend or resources.get("tts_backend")
+    key = hashlib.sha256(f"{backend.name}:{text}".encode("utf-8")).hexdigest()
+    cached_path = os.path.join(TTS_CACHE_DIR, f"{key}.{backend.extension}")
+    if os.path.exists(cached_path):
+        return cached_path
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    # Write under a unique name first so concurrent requests never read a half-written file
+    tmp_path = f"{cached_path}.{uuid.uuid4().hex}.tmp.{backend.extension}"
+    backend.synthesize(text, tmp_path)
+    os.replace(tmp_path, cached_path)
+    return cached_path
+
+
+def iter_speech_segments(text: str, backend=None, workers: int = TTS_WORKERS) -> Iterator[str]:
+    """
+    Synthesizes all sentence segments in parallel and yields their paths in reading order,
+    so playback can start as soon as the first sentence is ready.
+    """
+    backend = backend or resources.get("tts_backend")
+    segments = split_sentences(text)
+    if not segments:
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(segments)), thread_name_prefix="tts") as pool:
+        futures = [pool.submit(synthesize_segment, segment, backend) for segment in segments]
+        for future in futures:
+            yield future.result()
+
+
+def combine_segments(paths: List[str], output_path: str) -> str:
+    """Joins segment files into one: MP3 frames are concatenated, WAV data is re-framed."""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if output_path.endswith(".wav"):
+        with wave.open(output_path, "wb") as out:
+            for index, path in enumerate(paths):
+                with wave.open(path, "rb") as segment:
+                    if index == 0:
+                        out.setparams(segment.getparams())
+                    out.writeframes(segment.readframes(segment.getnframes()))
+    else:
+        with open(output_path, "wb") as out:
+            for path in paths:
+                with open(path, "rb") as segment:
+                    out.write(segment.read())
     return output_path
 
+
+def expire_outputs(output_dir: str = TTS_OUTPUT_DIR, max_age_seconds: float = TTS_OUTPUT_TTL) -> int:
+    """Deletes per-request audio files older than max_age_seconds (not the TTS cache). Returns the number deleted."""
+    if max_age_seconds <= 0 or not os.path.isdir(output_dir):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(output_dir):
+        try:
+            if entry.is_file() and entry.name.endswith((".mp3", ".wav")) and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def text_to_voice(text: str, output_path: Optional[str] = None, backend=None) -> str:
+    """
+    Converts text to speech sentence by sentence (in parallel, cached by text hash) and
+    writes the result to output_path, or to a unique per-request file when none is given.
+    """
+    backend = backend or resources.get("tts_backend")
+    if output_path is None:
+        expire_outputs()
+        output_path = os.path.join(TTS_OUTPUT_DIR, f"{uuid.uuid4().hex}.{backend.extension}")
+    else:
+        output_path = f"{os.path.splitext(output_path)[0]}.{backend.extension}"
+    return combine_segments(list(iter_speech_segments(text, backend)), output_path)
+
 if __name__ == "__main__":
     audio_file = "sample.wav"  # Use a WAV file here
     llm_response = "This is the LLM response."  # Replace with real response
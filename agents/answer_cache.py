@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from agents import resources, telemetry
+from agents.market_cache import DEFAULT_TTLS
+from agents.ticker_extractor import COMPANY_NAMES
+
+# ANSWER_CACHE=0 disables the cache. Answers live as long as the news they were built
+# from is considered fresh by the market data cache, unless overridden.
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") != "0"
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(DEFAULT_TTLS["news"])))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.88"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+# Only new chunks of these kinds invalidate cached answers; assistant chunks are rebuilt
+# from market data on every pipeline run and are covered by the TTL
+INVALIDATING_SOURCES = ("article", "news")
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_prompt(prompt: str, tickers: Iterable[str]) -> str:
+    """
+    Lowercases, strips punctuation and replaces the tickers' symbols and company names with
+    a placeholder, so "how is MSFT doing" and "how is Microsoft doing" embed alike. Tickers
+    are compared separately, so the placeholder can't mix up companies.
+    """
+    text = f" {prompt.lower()} "
+    symbols = {symbol.upper() for symbol in tickers}
+    names = [name for name, symbol in COMPANY_NAMES.items() if symbol in symbols]
+    for alias in sorted(names + [symbol.lower() for symbol in symbols], key=len, reverse=True):
+        text = re.sub(rf"(?<![\w$])\$?{re.escape(alias)}(?:'s)?(?!\w)", " company ", text)
+    return " ".join(PUNCTUATION.sub(" ", text).split())
+
+
+class SemanticAnswerCache:
+    """
+    Caches finished reports keyed on the embedding of the normalized prompt. A lookup hits
+    when a stored prompt for the same ticker set is at least `threshold` cosine-similar and
+    younger than `ttl` seconds. Least recently used entries are evicted past max_entries.
+
+    Args:
+        threshold (float): Minimum cosine similarity of normalized prompt embeddings
+        ttl (float): Seconds an answer is served
+        max_entries (int): Maximum number of cached answers
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+
+    def embed(self, prompt: str, tickers: Iterable[str]) -> np.ndarray:
+        # The MiniLM embeddings already loaded for retrieval (vectors are L2-normalized)
+        vector = resources.get("embeddings").embed_query(normalize_prompt(prompt, tickers))
+        return np.asarray(vector, dtype=np.float32)
+
+    def lookup(self, prompt: str, tickers: Iterable[str], vector: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """Returns the best matching stored value (with "similarity" and "age" added), or None."""
+        key = frozenset(t.upper() for t in tickers)
+        with telemetry.span("answer_cache.lookup"):
+            vector = self.embed(prompt, key) if vector is None else vector
+            now = time.time()
+            best_id, best_similarity = None, self.threshold
+            with self._lock:
+                for entry_id in [i for i, e in self._entries.items() if now - e["created_at"] > self.ttl]:
+                    del self._entries[entry_id]
+                    self.counters["expired"] += 1
+                for entry_id, entry in self._entries.items():
+                    if entry["tickers"] != key:
+                        continue
+                    similarity = float(np.dot(entry["vector"], vector))
+                    if similarity >= best_similarity:
+                        best_id, best_similarity = entry_id, similarity
+                if best_id is None:
+                    self.counters["misses"] += 1
+                    return None
+                self._entries.move_to_end(best_id)
+                self.counters["hits"] += 1
+                entry = self._entries[best_id]
+                return {**entry["value"], "similarity": best_similarity, "age": now - entry["created_at"]}
+
+    def store(self, prompt: str, tickers: Iterable[str], value: Dict[str, Any], vector: Optional[np.ndarray] = None) -> None:
+        key = frozenset(t.upper() for t in tickers)
+        vector = self.embed(prompt, key) if vector is None else vector
+        with self._lock:
+            self._entries[self._next_id] = {"tickers": key, "vector": vector, "value": value, "created_at": time.time()}
+            self._next_id += 1
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def invalidate_tickers(self, tickers: Iterable[str]) -> int:
+        """Drops every answer that mentions one of the tickers. Returns the number dropped."""
+        symbols = {t.upper() for t in tickers}
+        if not symbols:
+            return 0
+        with self._lock:
+            stale = [i for i, e in self._entries.items() if e["tickers"] & symbols]
+            for entry_id in stale:
+                del self._entries[entry_id]
+            self.counters["invalidated"] += len(stale)
+        return len(stale)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.counters["invalidated"] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._entries)
+        total = counters["hits"] + counters["misses"]
+        return {**counters, "entries": entries, "hit_rate": counters["hits"] / total if total else 0.0}
+
+
+answer_cache = SemanticAnswerCache()
+telemetry.register_collector("answer_cache", answer_cache.stats)
+
+
+def invalidate_for_ingest(metadatas: List[Dict[str, Any]]) -> None:
+    """Called with the metadata of newly stored chunks; drops answers about their tickers."""
+    tickers = set()
+    for metadata in metadatas:
+        if metadata.get("source_type") in INVALIDATING_SOURCES:
+            tickers.update(key[len("ticker_"):] for key, value in metadata.items() if key.startswith("ticker_") and value)
+    if tickers:
+        answer_cache.invalidate_tickers(tickers)
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from agents import resources, telemetry
+
+# Articles rarely change after publication, failures are retried after a short while
+ARTICLE_FRESH_SECONDS = float(os.getenv("ARTICLE_FRESH_SECONDS", str(24 * 3600)))
+ARTICLE_NEGATIVE_SECONDS = float(os.getenv("ARTICLE_NEGATIVE_SECONDS", str(3600)))
+ARTICLE_CACHE_MAX_BYTES = int(os.getenv("ARTICLE_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+ARTICLE_CACHE_DB = os.getenv("ARTICLE_CACHE_DB", os.path.join(resources.CACHE_DIR, "articles.sqlite3"))
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    """Lowercases scheme and host, drops fragments and tracking parameters, sorts the query."""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+class ArticleCache:
+    """
+    On-disk cache of extracted article text keyed by normalized URL.
+
+    Entries are served directly while fresh, then revalidated with a conditional GET using
+    the stored ETag/Last-Modified. Failures are negatively cached so dead links are not
+    retried on every request. The least recently used entries are evicted once the stored
+    text exceeds max_bytes.
+
+    Args:
+        db_path (str): SQLite file holding the cache
+        fresh_seconds (float): Age under which an entry is used without revalidation
+        negative_seconds (float): How long a failure is remembered
+        max_bytes (int): Upper bound on the total stored text size
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        fresh_seconds: float = ARTICLE_FRESH_SECONDS,
+        negative_seconds: float = ARTICLE_NEGATIVE_SECONDS,
+        max_bytes: int = ARTICLE_CACHE_MAX_BYTES,
+    ):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fresh_seconds = fresh_seconds
+        self.negative_seconds = negative_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "url TEXT PRIMARY KEY, text TEXT, etag TEXT, last_modified TEXT, error TEXT, "
+            "fetched_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self._db.commit()
+        self.counters = {"hits": 0, "revalidated": 0, "misses": 0, "negative_hits": 0, "evictions": 0}
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Returns the stored entry with an added "fresh" flag, or None."""
+        key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, etag, last_modified, error, fetched_at FROM articles WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            text, etag, last_modified, error, fetched_at = row
+            now = time.time()
+            max_age = self.negative_seconds if error else self.fresh_seconds
+            self._db.execute("UPDATE articles SET accessed_at = ? WHERE url = ?", (now, key))
+            self._db.commit()
+        return {
+            "text": text,
+            "etag": etag,
+            "last_modified": last_modified,
+            "error": error,
+            "fresh": now - fetched_at < max_age,
+        }
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry and not entry["error"]:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        self._write(url, text, etag, last_modified, None)
+
+    def store_failure(self, url: str, error: str) -> None:
+        self._write(url, None, None, None, error)
+
+    def mark_revalidated(self, url: str) -> None:
+        """Records a 304 Not Modified: the stored text is fresh again."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE articles SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, normalize_url(url))
+            )
+            self._db.commit()
+            self.counters["revalidated"] += 1
+
+    def record(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self.counters)
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM articles").fetchone()
+        served = counters["hits"] + counters["revalidated"] + counters["negative_hits"]
+        total = served + counters["misses"]
+        return {**counters, "entries": entries, "bytes": size, "hit_rate": served / total if total else 0.0}
+
+    def _write(self, url, text, etag, last_modified, error) -> None:
+        now = time.time()
+        size = len(text.encode("utf-8")) if text else 0
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO articles "
+                "(url, text, etag, last_modified, error, fetched_at, accessed_at, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), text, etag, last_modified, error, now, now, size),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        # Caller must hold the lock
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, size FROM articles ORDER BY accessed_at").fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM articles WHERE url = ?", (url,))
+            total -= size or 0
+            self.counters["evictions"] += 1
+
+
+def build_article_cache() -> ArticleCache:
+    cache = ArticleCache(ARTICLE_CACHE_DB)
+    telemetry.register_collector("article_cache", cache.stats)
+    return cache
+
+
+resources.register("article_cache", build_article_cache)
+
+
+def get_article_cache() -> ArticleCache:
+    return resources.get("article_cache")
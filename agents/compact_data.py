@@ -0,0 +1,97 @@
+from typing import Any, Dict, List, Optional
+import pandas as pd
+
+# Upper bounds that keep the get_data payload small whatever the time_range is
+HISTORY_MAX_ROWS = 60
+OPTION_STRIKES_PER_SIDE = 5
+OPTION_COLUMNS = [
+    "contractSymbol", "strike", "lastPrice", "bid", "ask",
+    "volume", "openInterest", "impliedVolatility", "inTheMoney",
+]
+OHLCV_AGGREGATION = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Adj Close": "last",
+    "Volume": "sum",
+    "Dividends": "sum",
+    "Stock Splits": "sum",
+}
+# Coarser resampling rules tried in order until the history fits HISTORY_MAX_ROWS
+RESAMPLE_RULES = [("W-FRI", "weekly"), ("MS", "monthly"), ("QS", "quarterly"), ("YS", "yearly")]
+
+
+def frame_to_columns(frame: pd.DataFrame, columns: Optional[List[str]] = None, decimals: int = 4) -> Dict[str, Any]:
+    """
+    Converts a DataFrame into a compact columnar dict: one list per column plus a shared index.
+
+    Args:
+        frame (pd.DataFrame): Frame to serialize
+        columns (list[str]): Optional subset of columns to keep
+        decimals (int): Floats are rounded to this many decimals
+
+    Returns:
+        dict: {"index": [...], "columns": {name: [...]}}
+    """
+    if columns is not None:
+        frame = frame[[c for c in columns if c in frame.columns]]
+    frame = frame.round(decimals)
+    if isinstance(frame.index, pd.DatetimeIndex):
+        fmt = "%Y-%m-%d" if (frame.index.normalize() == frame.index).all() else "%Y-%m-%dT%H:%M"
+        index = frame.index.strftime(fmt).tolist()
+    else:
+        index = frame.index.tolist()
+    return {"index": index, "columns": {str(name): column_values(frame[name]) for name in frame.columns}}
+
+
+def column_values(column: pd.Series) -> list:
+    if pd.api.types.is_datetime64_any_dtype(column):
+        column = column.dt.strftime("%Y-%m-%dT%H:%M")
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def downsample_history(hist: pd.DataFrame, max_rows: int = HISTORY_MAX_ROWS):
+    """Resamples OHLCV history to the finest of weekly/monthly/... that fits max_rows. Returns (frame, interval)."""
+    if len(hist) <= max_rows or not isinstance(hist.index, pd.DatetimeIndex):
+        return hist, "native"
+    aggregation = {name: OHLCV_AGGREGATION.get(name, "last") for name in hist.columns}
+    resampled = hist
+    for rule, label in RESAMPLE_RULES:
+        resampled = hist.resample(rule).agg(aggregation).dropna(how="all")
+        if len(resampled) <= max_rows:
+            return resampled, label
+    return resampled.tail(max_rows), label
+
+
+def serialize_history(hist: pd.DataFrame, summary: bool = True, max_rows: int = HISTORY_MAX_ROWS) -> Dict[str, Any]:
+    interval = "native"
+    if summary:
+        hist, interval = downsample_history(hist, max_rows)
+    payload = frame_to_columns(hist)
+    payload["interval"] = interval
+    return payload
+
+
+def near_the_money(chain: pd.DataFrame, price: Any, strikes_per_side: int = OPTION_STRIKES_PER_SIDE) -> pd.DataFrame:
+    """Keeps the strikes closest to the current price, strikes_per_side on each side."""
+    if chain.empty or "strike" not in chain.columns or not isinstance(price, (int, float)):
+        return chain.head(2 * strikes_per_side)
+    below = chain[chain["strike"] <= price].nlargest(strikes_per_side, "strike")
+    above = chain[chain["strike"] > price].nsmallest(strikes_per_side, "strike")
+    return pd.concat([below, above]).sort_values("strike")
+
+
+def serialize_options(options: Any, price: Any, summary: bool = True) -> Any:
+    """Serializes {"expiration_date", "calls", "puts"} with DataFrame chains into columnar form."""
+    if not isinstance(options, dict):
+        return options
+    payload = {"expiration_date": options["expiration_date"]}
+    for side in ("calls", "puts"):
+        chain = options[side]
+        total = len(chain)
+        if summary:
+            chain = near_the_money(chain, price)
+        payload[side] = frame_to_columns(chain, OPTION_COLUMNS if summary else None)
+        payload[side]["total_contracts"] = total
+    return payload
@@ -0,0 +1,231 @@
+import hashlib
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Optional, Tuple
+from agents import resources, telemetry
+
+# llama3-8b-8192 context window, minus room for the generated report
+CONTEXT_WINDOW_TOKENS = int(os.getenv("CONTEXT_WINDOW_TOKENS", "8192"))
+RESPONSE_TOKENS = int(os.getenv("RESPONSE_TOKENS", "1024"))
+# Chunk scoring: weighted retrieval relevance and recency (halves every half-life)
+RELEVANCE_WEIGHT = 0.7
+RECENCY_WEIGHT = 0.3
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("RECENCY_HALF_LIFE_HOURS", "72"))
+# SimHash fingerprints closer than this many bits are treated as near-duplicates
+# (unrelated texts differ in ~32 of 64 bits; a reworded sentence in a chunk moves ~5-8)
+SIMHASH_MAX_DISTANCE = 8
+# Passages longer than this are split before packing so one huge chunk can't block the budget
+MAX_PASSAGE_TOKENS = 512
+# "auto" summarizes with map-reduce once the candidates exceed the budget by this factor,
+# "pack" never summarizes, "map_reduce" always does when the budget is exceeded
+CONTEXT_MODE = os.getenv("CONTEXT_MODE", "auto")
+MAP_REDUCE_FACTOR = float(os.getenv("MAP_REDUCE_FACTOR", "2.0"))
+MAP_GROUP_TOKENS = int(os.getenv("MAP_GROUP_TOKENS", "3000"))
+MAP_WORKERS = int(os.getenv("MAP_WORKERS", "4"))
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+PASSAGE_SPLIT = re.compile(r"\n\s*\n|(?<=[.!?])\s+")
+SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast, slightly pessimistic token count: every punctuation mark is one token and words
+    cost one token per 4 characters (Llama 3 averages ~1.3 tokens per English word).
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in TOKEN_PATTERN.findall(text))
+
+
+def context_budget(reserved_text: str = "") -> int:
+    """Tokens left for context once the response and the rest of the prompt are accounted for."""
+    return max(0, CONTEXT_WINDOW_TOKENS - RESPONSE_TOKENS - estimate_tokens(reserved_text))
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """64-bit SimHash over word 3-shingles."""
+    words = text.lower().split()
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * bits
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def is_near_duplicate(fingerprint: int, seen: List[int]) -> bool:
+    return any(bin(fingerprint ^ other).count("1") <= SIMHASH_MAX_DISTANCE for other in seen)
+
+
+def split_passages(text: str, max_tokens: int = MAX_PASSAGE_TOKENS) -> List[str]:
+    """Splits text on paragraph, then sentence boundaries into passages of at most max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    passages, current, current_tokens = [], [], 0
+    for piece in PASSAGE_SPLIT.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            passages.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def to_candidates(chunks: Iterable[Any]) -> List[Tuple[str, Optional[float], Optional[float]]]:
+    """
+    Normalizes chunks into (text, relevance, published_at). Accepts strings, Documents and
+    (Document, score) pairs as returned by search_chunks.
+    """
+    candidates = []
+    for item in chunks:
+        relevance = None
+        if isinstance(item, tuple):
+            item, relevance = item
+        if isinstance(item, str):
+            text, published_at = item, None
+        else:
+            text, published_at = item.page_content, (item.metadata or {}).get("published_at")
+        if text and text.strip():
+            candidates.append((text.strip(), relevance, published_at))
+    return candidates
+
+
+def score_candidates(candidates, now: float) -> List[float]:
+    """Relevance (rank order when the retriever gave no score) blended with recency."""
+    scores = []
+    for rank, (_, relevance, published_at) in enumerate(candidates):
+        if relevance is None:
+            relevance = 1.0 - rank / max(1, len(candidates))
+        recency = 0.5
+        if published_at:
+            age_hours = max(0.0, now - float(published_at)) / 3600
+            recency = 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+        scores.append(RELEVANCE_WEIGHT * relevance + RECENCY_WEIGHT * recency)
+    return scores
+
+
+def select_passages(chunks: Iterable[Any], now: Optional[float] = None) -> List[Tuple[int, float, str, int]]:
+    """
+    Scores, splits and de-duplicates chunks.
+
+    Returns:
+        list[tuple]: (original position, score, passage, estimated tokens), best score first
+    """
+    candidates = to_candidates(chunks)
+    scores = score_candidates(candidates, now or time.time())
+    passages = []
+    for position, ((text, _, _), score) in enumerate(zip(candidates, scores)):
+        for passage in split_passages(text):
+            passages.append((position, score, passage, estimate_tokens(passage)))
+    passages.sort(key=lambda p: p[1], reverse=True)
+
+    unique, seen = [], []
+    for passage in passages:
+        fingerprint = simhash(passage[2])
+        if is_near_duplicate(fingerprint, seen):
+            continue
+        seen.append(fingerprint)
+        unique.append(passage)
+    return unique
+
+
+def fill_budget(passages: List[Tuple[int, float, str, int]], budget_tokens: int, keep_order: bool = False) -> List[str]:
+    """Greedily takes the best passages that still fit; smaller ones can fill the remaining room."""
+    chosen, used = [], 0
+    separator_tokens = estimate_tokens(SEPARATOR)
+    for passage in passages:
+        if used + passage[3] + separator_tokens <= budget_tokens:
+            chosen.append(passage)
+            used += passage[3] + separator_tokens
+    if keep_order:
+        chosen.sort(key=lambda p: p[0])
+    return [p[2] for p in chosen]
+
+
+def summarize_group(texts: List[str], max_words: int, llm=None) -> str:
+    llm = llm or resources.get_llm()
+    excerpts = SEPARATOR.join(texts)
+    prompt = f"""
+    Summarize the following financial excerpts in at most {max_words} words.
+    Keep every figure, ticker, date and named event; drop repetition and boilerplate.
+
+    {excerpts}
+    """
+    return llm.invoke(prompt).content
+
+
+def map_reduce(passages: List[Tuple[int, float, str, int]], budget_tokens: int, llm=None) -> List[str]:
+    """
+    Summarizes groups of passages in parallel (map), then packs the summaries into the
+    budget (reduce). Passages are grouped in reading order so each summary stays coherent.
+    """
+    ordered = sorted(passages, key=lambda p: p[0])
+    groups, current, current_tokens = [], [], 0
+    for passage in ordered:
+        if current and current_tokens + passage[3] > MAP_GROUP_TOKENS:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(passage[2])
+        current_tokens += passage[3]
+    if current:
+        groups.append(current)
+
+    # Each summary gets an equal share of the budget (~0.75 words per token)
+    max_words = max(40, int(budget_tokens / len(groups) * 0.75))
+    with ThreadPoolExecutor(max_workers=min(MAP_WORKERS, len(groups)), thread_name_prefix="map") as pool:
+        summaries = list(pool.map(lambda group: summarize_group(group, max_words, llm), groups))
+
+    reduced = [(i, 1.0, summary.strip(), estimate_tokens(summary)) for i, summary in enumerate(summaries) if summary.strip()]
+    return fill_budget(reduced, budget_tokens, keep_order=True)
+
+
+def pack_context(
+    chunks: Iterable[Any],
+    budget_tokens: int,
+    mode: str = CONTEXT_MODE,
+    keep_order: bool = False,
+    now: Optional[float] = None,
+    llm=None,
+) -> str:
+    """
+    Builds the context block for an LLM prompt within budget_tokens.
+
+    Chunks are scored by retrieval relevance and recency, near-duplicates are dropped and
+    the best passages are packed until the budget is full. When the candidates exceed the
+    budget by more than MAP_REDUCE_FACTOR ("auto") they are summarized map-reduce style
+    instead of truncated.
+
+    Args:
+        chunks (Iterable): Strings, Documents or (Document, score) pairs
+        budget_tokens (int): Estimated tokens available for the context
+        mode (str): "auto", "pack" or "map_reduce"
+        keep_order (bool): Keep the input order instead of best-first (e.g. for a narrative)
+
+    Returns:
+        str: The packed context
+    """
+    with telemetry.span("context.pack", budget_tokens=budget_tokens) as attrs:
+        passages = select_passages(chunks, now)
+        total = sum(p[3] for p in passages)
+        attrs.update(passages=len(passages), candidate_tokens=total)
+
+        summarize = total > budget_tokens and (
+            mode == "map_reduce" or (mode == "auto" and total > budget_tokens * MAP_REDUCE_FACTOR)
+        )
+        if summarize:
+            telemetry.incr("context_map_reduce_total")
+            selected = map_reduce(passages, budget_tokens, llm)
+        else:
+            selected = fill_budget(passages, budget_tokens, keep_order)
+        attrs["mode"] = "map_reduce" if summarize else "pack"
+        telemetry.incr("context_passages_dropped_total", max(0, len(passages) - len(selected)))
+        return SEPARATOR.join(selected)
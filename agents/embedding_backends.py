@@ -0,0 +1,138 @@
+import os
+from typing import List, Optional
+from dotenv import load_dotenv
+from agents import resources
+load_dotenv()
+
+# "hf" (sentence-transformers on PyTorch), "onnx" (ONNX Runtime, fp32) or "onnx-int8"
+# (ONNX Runtime, dynamically quantized weights). The ONNX backends need onnxruntime,
+# tokenizers and huggingface_hub but not torch.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hf")
+# Intra-op threads for encoding (0 = library default) and texts per forward pass. The ONNX
+# backends set it per session; for "hf" it is torch.set_num_threads, which is process-wide
+# and applies to every other torch user in the process too.
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "32"))
+# all-MiniLM-L6-v2 was trained with 256 word pieces; longer inputs are truncated like sentence-transformers does
+MAX_SEQ_LENGTH = 256
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(resources.CACHE_DIR, "onnx"))
+# Pre-quantized export shipped in the model repo; quantized locally when missing
+ONNX_INT8_FILE = os.getenv("ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+
+def model_id(model_name: str, backend: str = EMBEDDING_BACKEND) -> str:
+    """Namespace for cached vectors: quantized vectors differ slightly, so they are cached apart."""
+    return model_name if backend == "hf" else f"{model_name}:{backend}"
+
+
+def collection_name(base: str, backend: str = EMBEDDING_BACKEND) -> str:
+    """Chroma collection per backend, so queries are never compared with another backend's vectors."""
+    return base if backend == "hf" else f"{base}_{backend}"
+
+
+class OnnxSentenceEmbeddings:
+    """
+    Sentence-transformers compatible encoder on ONNX Runtime: word-piece tokenization,
+    transformer forward pass, attention-masked mean pooling and L2 normalization, the same
+    steps as all-MiniLM-L6-v2's sentence-transformers pipeline. Implements the LangChain
+    Embeddings interface, so it can be the Chroma embedding_function.
+
+    Args:
+        model_name (str): Hugging Face repo with an onnx/ export and tokenizer.json
+        quantized (bool): Use int8 weights (downloaded, or quantized locally on first use)
+        threads (int): ONNX Runtime intra-op threads (0 = all cores)
+        batch_size (int): Texts per forward pass
+    """
+
+    def __init__(self, model_name: str, quantized: bool = False, threads: int = EMBED_THREADS,
+                 batch_size: int = ENCODE_BATCH_SIZE):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The onnx embedding backends need: pip install onnxruntime tokenizers huggingface_hub") from e
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(self._download("tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.no_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_path = self._int8_model() if quantized else self._download("onnx/model.onnx")
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _download(self, filename: str) -> str:
+        from huggingface_hub import hf_hub_download
+        return hf_hub_download(self.model_name, filename, cache_dir=ONNX_CACHE_DIR)
+
+    def _int8_model(self) -> str:
+        try:
+            return self._download(ONNX_INT8_FILE)
+        except Exception as e:
+            print(f"No pre-quantized {ONNX_INT8_FILE} ({e}), quantizing locally")
+        quantized_path = os.path.join(ONNX_CACHE_DIR, self.model_name.replace("/", "--"), "model_int8.onnx")
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            os.makedirs(os.path.dirname(quantized_path), exist_ok=True)
+            quantize_dynamic(self._download("onnx/model.onnx"), quantized_path, weight_type=QuantType.QInt8)
+        return quantized_path
+
+    def _encode_batch(self, texts: List[str]):
+        import numpy as np
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(texts), length), dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": np.zeros_like(input_ids)}
+        hidden = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Length-sorted batches keep padding (wasted compute) to a minimum
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for index, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                vectors[index] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode_batch([text])[0].tolist()
+
+
+def build_huggingface_embeddings(model_name: str, model_kwargs: dict, encode_kwargs: dict,
+                                 threads: int = EMBED_THREADS, batch_size: int = ENCODE_BATCH_SIZE):
+    from langchain_huggingface import HuggingFaceEmbeddings
+    if threads > 0:
+        import torch
+        # Process-wide: torch has no per-model thread pool
+        torch.set_num_threads(threads)
+    return HuggingFaceEmbeddings(
+        model_name=model_name, model_kwargs=model_kwargs, encode_kwargs={**encode_kwargs, "batch_size": batch_size}
+    )
+
+
+def build_embeddings(model_name: str, model_kwargs: dict, encode_kwargs: dict, backend: str = EMBEDDING_BACKEND,
+                     threads: int = EMBED_THREADS, batch_size: int = ENCODE_BATCH_SIZE):
+    """Returns a LangChain-compatible embeddings object for the configured backend."""
+    if backend == "hf":
+        return build_huggingface_embeddings(model_name, model_kwargs, encode_kwargs, threads, batch_size)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxSentenceEmbeddings(model_name, quantized=backend == "onnx-int8", threads=threads, batch_size=batch_size)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend!r} (expected hf, onnx or onnx-int8)")
@@ -0,0 +1,95 @@
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+SMA_WINDOWS = (20, 50)
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+VOLUME_WINDOW = 20
+VOLUME_ANOMALY_Z = 2.0
+
+
+def stack_column(histories: Dict[str, pd.DataFrame], column: str) -> pd.DataFrame:
+    """Aligns one column of every ticker's history into a wide frame (dates x tickers)."""
+    series = {
+        symbol: hist[column]
+        for symbol, hist in histories.items()
+        if hist is not None and not hist.empty and column in hist.columns
+    }
+    if not series:
+        return pd.DataFrame()
+    return pd.concat(series, axis=1).sort_index()
+
+
+def compute_indicators(histories: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Computes technical indicators for every ticker in one vectorized pass.
+
+    Args:
+        histories (dict): Ticker symbol -> OHLCV history DataFrame as returned by yfinance
+
+    Returns:
+        pd.DataFrame: One row per ticker with returns, volatility, moving averages, RSI,
+                      MACD, drawdown and volume anomaly columns
+    """
+    close = stack_column(histories, "Close")
+    if close.empty:
+        return pd.DataFrame()
+    volume = stack_column(histories, "Volume").reindex(columns=close.columns)
+
+    returns = close.pct_change(fill_method=None)
+    last = close.ffill().iloc[-1]
+    first = close.bfill().iloc[0]
+
+    # RSI with Wilder smoothing
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / RSI_PERIOD, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / RSI_PERIOD, adjust=False).mean()
+    rsi = 100 - 100 / (1 + gain / loss.replace(0, np.nan))
+
+    macd = close.ewm(span=MACD_FAST, adjust=False).mean() - close.ewm(span=MACD_SLOW, adjust=False).mean()
+    macd_signal = macd.ewm(span=MACD_SIGNAL, adjust=False).mean()
+
+    drawdown = close / close.cummax() - 1
+
+    volume_mean = volume.rolling(VOLUME_WINDOW, min_periods=5).mean()
+    volume_std = volume.rolling(VOLUME_WINDOW, min_periods=5).std()
+    volume_z = (volume - volume_mean) / volume_std.replace(0, np.nan)
+
+    summary = pd.DataFrame({
+        "last_close": last,
+        "day_change_pct": returns.iloc[-1] * 100,
+        "period_return_pct": (last / first - 1) * 100,
+        "volatility_ann_pct": returns.std() * np.sqrt(TRADING_DAYS) * 100,
+        "rsi_14": rsi.iloc[-1],
+        "macd": macd.iloc[-1],
+        "macd_signal": macd_signal.iloc[-1],
+        "drawdown_pct": drawdown.iloc[-1] * 100,
+        "max_drawdown_pct": drawdown.min() * 100,
+        "volume_z": volume_z.iloc[-1],
+        "volume_anomaly_days": (volume_z.abs() >= VOLUME_ANOMALY_Z).sum(),
+        "bars": close.notna().sum(),
+    })
+    for window in SMA_WINDOWS:
+        sma = close.rolling(window).mean().iloc[-1]
+        summary[f"sma_{window}"] = sma
+        summary[f"vs_sma_{window}_pct"] = (last / sma - 1) * 100
+    return summary.round(2)
+
+
+def indicators_to_dict(summary: pd.DataFrame) -> Dict[str, Dict[str, Optional[float]]]:
+    """Ticker -> {indicator: value} with NaN mapped to None."""
+    return {
+        symbol: {name: (None if pd.isna(value) else float(value)) for name, value in row.items()}
+        for symbol, row in summary.iterrows()
+    }
+
+
+def format_indicator_summary(summary: pd.DataFrame, columns: Optional[List[str]] = None) -> str:
+    """Renders the indicator table as compact CSV text for an LLM prompt."""
+    if summary.empty:
+        return ""
+    if columns is not None:
+        summary = summary[[c for c in columns if c in summary.columns]]
+    return summary.to_csv(index_label="ticker", na_rep="NA", float_format="%.2f").strip()
@@ -0,0 +1,168 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+from agents import telemetry
+load_dotenv()
+
+# Time-to-live in seconds for each class of market data
+DEFAULT_TTLS = {
+    "current_price": 15,
+    "options": 5 * 60,
+    "news": 10 * 60,
+    "history": 6 * 60 * 60,
+}
+DEFAULT_TTL = 60
+
+
+class MarketDataCache:
+    """
+    Thread-safe TTL + LRU cache for market data, with an optional SQLite backend
+    so entries survive process restarts.
+
+    Args:
+        ttls (dict): Seconds to live per namespace (e.g. "history", "news")
+        max_entries (int): Maximum number of entries kept in memory
+        db_path (str): Optional SQLite file used as a persistent second level
+        max_disk_entries (int): Maximum number of rows kept in the SQLite file
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = 1024,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 10000,
+    ):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT, key TEXT, value BLOB, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def ttl_for(self, namespace: str) -> float:
+        return self.ttls.get(namespace, DEFAULT_TTL)
+
+    def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        """Returns (found, value) for a cached entry that has not expired."""
+        cache_key = (namespace, key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[cache_key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    cache_key,
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = pickle.loads(row[0])
+                    self._store(cache_key, row[1], value)
+                    self.hits += 1
+                    return True, value
+
+            self.misses += 1
+            return False, None
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        cache_key = (namespace, key)
+        expires_at = time.time() + self.ttl_for(namespace)
+        with self._lock:
+            self._store(cache_key, expires_at, value)
+            if self._db is not None:
+                try:
+                    blob = pickle.dumps(value)
+                except Exception:
+                    return
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, blob, expires_at),
+                )
+                self._trim_disk()
+                self._db.commit()
+
+    def get_or_fetch(self, namespace: str, key: str, fetch: Callable[..., Any], *args) -> Any:
+        """Returns the cached value or calls fetch(*args) and caches its result. Errors are not cached."""
+        found, value = self.get(namespace, key)
+        if found:
+            return value
+        value = fetch(*args)
+        self.set(namespace, key, value)
+        return value
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        """Drops every entry, or only the entries of one namespace."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for cache_key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[cache_key]
+            if self._db is not None:
+                if namespace is None:
+                    self._db.execute("DELETE FROM cache")
+                else:
+                    self._db.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _store(self, cache_key, expires_at: float, value: Any) -> None:
+        # Caller must hold the lock
+        self._entries[cache_key] = (expires_at, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _trim_disk(self) -> None:
+        # Caller must hold the lock
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM cache WHERE rowid NOT IN "
+            "(SELECT rowid FROM cache ORDER BY expires_at DESC LIMIT ?)",
+            (self.max_disk_entries,),
+        )
+
+
+# Shared cache used by get_data and yahoo_finance_news
+market_cache = MarketDataCache(
+    max_entries=int(os.getenv("MARKET_CACHE_MAX_ENTRIES", "1024")),
+    db_path=os.getenv("MARKET_CACHE_DB") or None,
+)
+telemetry.register_collector("market_cache", market_cache.stats)
@@ -0,0 +1,72 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+load_dotenv()
+
+# Root directory for the on-disk caches (SQLite files, model exports). Nothing is created
+# there at import time; each cache opens its file when first used.
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+
+# Process-wide registry of expensive objects (LLM clients, models, stores, HTTP sessions).
+# Factories are registered cheaply at import time and only run on first use.
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def register(name: str, factory: Callable[[], Any]) -> None:
+    """Registers a factory; re-registering a name drops any instance already built."""
+    with _registry_lock:
+        _factories[name] = factory
+        _locks.setdefault(name, threading.Lock())
+        _instances.pop(name, None)
+
+
+def get(name: str) -> Any:
+    """Returns the shared instance, building it on first use. Safe to call from any thread."""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _registry_lock:
+        if name not in _factories:
+            raise KeyError(f"No resource registered under {name!r}")
+        lock = _locks[name]
+    # Per-resource lock so loading one model doesn't block access to the others
+    with lock:
+        instance = _instances.get(name)
+        if instance is None:
+            instance = _factories[name]()
+            _instances[name] = instance
+    return instance
+
+
+def is_loaded(name: str) -> bool:
+    return name in _instances
+
+
+def reset(name: Optional[str] = None) -> None:
+    """Drops built instances so they are rebuilt on next use (all of them when name is None)."""
+    with _registry_lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def build_groq_llm():
+    from langchain_groq import ChatGroq
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not found in environment variables.")
+    from agents import telemetry
+    return ChatGroq(model="llama3-8b-8192", groq_api_key=api_key, callbacks=telemetry.llm_callbacks())
+
+
+register("groq_llm", build_groq_llm)
+
+
+def get_llm():
+    """Shared ChatGroq client for llama3-8b-8192."""
+    return get("groq_llm")
@@ -1,38 +1,33 @@
 from pydantic import BaseModel, Field
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from typing import List, Optional
+from collections import OrderedDict
+import threading
 import os
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+from agents import resources, telemetry
+from agents.ticker_extractor import extract_tickers, extract_time_from, get_default_time_from
 
 # Load environment variables
 load_dotenv()
 api_key = os.getenv("GROQ_API_KEY")
 alpha_vantage_api_key = os.getenv("ALPHA_VANTAGE_API_KEY", "demo")  # Fallback to 'demo'
 
-# Validate API key
-if not api_key:
-    raise ValueError("Missing GROQ_API_KEY in environment variables")
-
 # Define Pydantic model for URL variables
 class URL_variables(BaseModel):
     """Variables for constructing Alpha Vantage API URLs"""
     Tickers: List[str] = Field(..., description="List of stock market index tickers (e.g., ASIA50, HSI, KOSPI)")
     Time_From: str = Field(..., description="Start time in YYYYMMDDTHHMM format, e.g., 20250429T0000")
 
-# Define the Groq LLM with tools
-groq_model = ChatGroq(
-    model_name="llama3-8b-8192",
-    groq_api_key=api_key,
-)
+# Define the Groq LLM with tools; built on first use since most prompts never need it
+def build_url_variables_llm():
+    # Validate API key
+    if not api_key:
+        raise ValueError("Missing GROQ_API_KEY in environment variables")
+    return resources.get_llm().bind_tools([URL_variables])
 
-llm_with_tools = groq_model.bind_tools([URL_variables])
 
-# Define a function to calculate a default time_from (last 1 month in UTC)
-def get_default_time_from() -> str:
-    """Returns start date for the last 1 month in YYYYMMDDTHHMM format (UTC)"""
-    start_date = datetime.now(timezone.utc) - timedelta(days=30)
-    return start_date.strftime("%Y%m%dT%H%M")
+resources.register("url_variables_llm", build_url_variables_llm)
 
 # Define a function to parse and validate time_from
 def parse_time_from(time_from: Optional[str]) -> str:
@@ -47,21 +42,14 @@ def parse_time_from(time_from: Optional[str]) -> str:
     except (ValueError, TypeError):
         return get_default_time_from()
 
-# Define the main function to generate Alpha Vantage URL from prompt
-def generate_alpha_vantage_url_from_prompt(prompt: str) -> str:
-    """
-    Generates an Alpha Vantage API URL for news sentiment data based on a user prompt.
-    
-    Args:
-        prompt (str): User prompt specifying tickers and time_from (e.g., "Provide stock markets data for ASIA50 and HSI from 20250501T0000").
-    
-    Returns:
-        str: The constructed API URL in the format:
-             https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers=...&time_from=...&limit=1000&apikey=...
-    
-    Raises:
-        ValueError: If no valid tickers are extracted from the prompt.
-    """
+# Memo of normalized prompt -> URL_variables, bounded LRU
+URL_VARIABLES_MEMO_SIZE = 512
+url_variables_memo: "OrderedDict[tuple, URL_variables]" = OrderedDict()
+url_variables_memo_lock = threading.Lock()
+
+
+def llm_extract_url_variables(prompt: str) -> dict:
+    """Asks the LLM for tickers and time_from; used only when the fast extractor finds no tickers."""
     # Define the LLM prompt template
     llm_prompt = f"""You are a financial assistant tasked with providing data for stock market indices. Follow these instructions:
 
@@ -78,7 +66,7 @@ Output the variables using the URL_variables tool.
 
     # Invoke the LLM to extract tickers and time_from
     try:
-        response = llm_with_tools.invoke(llm_prompt).tool_calls
+        response = resources.get("url_variables_llm").invoke(llm_prompt).tool_calls
     except Exception as e:
         print(f"Error invoking LLM: {e}")
         # Fallback to default values
@@ -93,84 +81,308 @@ Output the variables using the URL_variables tool.
     if not response:
         raise ValueError("No valid response from the model")
 
-    args = response[0]["args"]
-    
+    return response[0]["args"]
+
+
+def extract_url_variables(prompt: str) -> URL_variables:
+    """
+    Extracts tickers and time_from from a prompt. A deterministic symbol/company-name
+    lookup and date regexes run first; the LLM is only called when no ticker is found.
+    Results are memoized per normalized prompt and UTC day (relative dates depend on it).
+
+    Raises:
+        ValueError: If no valid tickers are extracted from the prompt.
+    """
+    memo_key = (" ".join(prompt.split()).lower(), datetime.now(timezone.utc).date())
+    with url_variables_memo_lock:
+        if memo_key in url_variables_memo:
+            url_variables_memo.move_to_end(memo_key)
+            return url_variables_memo[memo_key]
+
+    tickers = extract_tickers(prompt)
+    if tickers:
+        args = {"Tickers": tickers, "Time_From": extract_time_from(prompt)}
+    else:
+        args = llm_extract_url_variables(prompt)
+
     # Extract and validate tickers
     tickers = args.get("Tickers")
     if not tickers or not all(isinstance(t, str) and t.strip() for t in tickers):
         raise ValueError("No valid tickers provided")
 
     # Parse and validate time_from
-    time_from = parse_time_from(args.get("Time_From"))
+    variables = URL_variables(Tickers=tickers, Time_From=parse_time_from(args.get("Time_From")))
+    with url_variables_memo_lock:
+        url_variables_memo[memo_key] = variables
+        while len(url_variables_memo) > URL_VARIABLES_MEMO_SIZE:
+            url_variables_memo.popitem(last=False)
+    return variables
+
+
+# Define the main function to generate Alpha Vantage URL from prompt
+def generate_alpha_vantage_url_from_prompt(prompt: str) -> str:
+    """
+    Generates an Alpha Vantage API URL for news sentiment data based on a user prompt.
+    
+    Args:
+        prompt (str): User prompt specifying tickers and time_from (e.g., "Provide stock markets data for ASIA50 and HSI from 20250501T0000").
+    
+    Returns:
+        str: The constructed API URL in the format:
+             https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers=...&time_from=...&limit=1000&apikey=...
+    
+    Raises:
+        ValueError: If no valid tickers are extracted from the prompt.
+    """
+    variables = extract_url_variables(prompt)
+    return generate_alpha_vantage_url(variables.Tickers, variables.Time_From)
+
 
+def generate_alpha_vantage_url(tickers: List[str], time_from: str, limit: int = 10, sort: Optional[str] = None) -> str:
+    """NEWS_SENTIMENT URL for tickers published since time_from (YYYYMMDDTHHMM); sort is LATEST or EARLIEST."""
     # Construct URL
     base_url = "https://www.alphavantage.co/query"
     function = "NEWS_SENTIMENT"
-    limit = 10
     tickers_str = ",".join(tickers)  # Combine tickers into a comma-separated string
     url = f"{base_url}?function={function}&tickers={tickers_str}&time_from={time_from}&limit={limit}&apikey={alpha_vantage_api_key}"
-    
+    if sort:
+        url += f"&sort={sort}"
     return url
 
 
 
 
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+import time
+import requests
+from agents.article_cache import get_article_cache
+
+# Scraper settings
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "8"))
+SCRAPE_PER_HOST = int(os.getenv("SCRAPE_PER_HOST", "2"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "10"))
+SCRAPE_DEADLINE = float(os.getenv("SCRAPE_DEADLINE", "20"))
+SCRAPE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Prefer lxml when installed; either way only <p> tags are built into the tree
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+PARAGRAPHS_ONLY = SoupStrainer("p")
+
+
+def build_session(pool_size: int = SCRAPE_WORKERS) -> requests.Session:
+    """Session with keep-alive connection pooling shared by all scraper threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(SCRAPE_HEADERS)
+    return session
+
+
+resources.register("scrape_session", build_session)
+host_limits = {}
+host_limits_lock = threading.Lock()
+
+
+def host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with host_limits_lock:
+        if host not in host_limits:
+            host_limits[host] = threading.BoundedSemaphore(SCRAPE_PER_HOST)
+        return host_limits[host]
 
-def scrape_article_content(url):
-    try:
-        # Send HTTP request to the URL
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()  # Raise an error for bad status codes
 
-        # Parse the page with BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
+def extract_paragraphs(html: str) -> str:
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=PARAGRAPHS_ONLY)
+    texts = (p.get_text().strip() for p in soup.find_all('p'))
+    return ' '.join(text for text in texts if text)
 
-        # Extract article content (e.g., text within <p> tags)
-        paragraphs = soup.find_all('p')
-        article_text = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
 
+def fetch_article_text(url: str, session: Optional[requests.Session] = None, deadline: Optional[float] = None) -> str:
+    """
+    Downloads and extracts the <p> text of one article. Raises on HTTP errors or when
+    the per-host slot or the global deadline can't be met.
+
+    Results go through the article cache: fresh entries skip the network, stale ones are
+    revalidated with a conditional GET and recent failures are raised again without a request.
+    """
+    article_cache = get_article_cache()
+    cached = article_cache.lookup(url)
+    if cached and cached["fresh"]:
+        if cached["error"]:
+            article_cache.record("negative_hits")
+            raise RuntimeError(f"cached failure: {cached['error']}")
+        article_cache.record("hits")
+        return cached["text"]
+
+    session = session or resources.get("scrape_session")
+    timeout = SCRAPE_TIMEOUT
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            raise TimeoutError("scrape deadline exceeded")
+    semaphore = host_semaphore(url)
+    if not semaphore.acquire(timeout=timeout):
+        raise TimeoutError("timed out waiting for a per-host connection slot")
+    try:
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError("scrape deadline exceeded")
+        try:
+            response = session.get(url, timeout=timeout, headers=article_cache.conditional_headers(cached))
+            if response.status_code == 304 and cached and not cached["error"]:
+                article_cache.mark_revalidated(url)
+                return cached["text"]
+            response.raise_for_status()  # Raise an error for bad status codes
+        except requests.RequestException as e:
+            article_cache.store_failure(url, str(e))
+            raise
+        article_cache.record("misses")
+        telemetry.incr("bytes_fetched_total", len(response.content), source="article")
+        article_text = extract_paragraphs(response.text)
+        article_cache.store(url, article_text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return article_text
+    finally:
+        semaphore.release()
+
+
+def scrape_article_content(url, session: Optional[requests.Session] = None):
+    try:
+        article_text = fetch_article_text(url, session)
         return article_text if article_text else "No article content found."
     except Exception as e:
         return f"Error scraping {url}: {str(e)}"
-    
 
-import requests
+
+def iter_scraped_articles(
+    urls: List[str],
+    session: Optional[requests.Session] = None,
+    max_workers: int = SCRAPE_WORKERS,
+    deadline_seconds: float = SCRAPE_DEADLINE,
+):
+    """
+    Scrapes urls concurrently and yields (url, text) as each finishes. text is None when
+    the page failed or returned no paragraphs. Pages still pending when the global
+    deadline passes are abandoned so one slow site can't stall the pipeline.
+    """
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return
+    deadline = time.monotonic() + deadline_seconds
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="scraper")
+    futures = {executor.submit(fetch_article_text, url, session, deadline): url for url in urls}
+    try:
+        for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+            url = futures[future]
+            try:
+                yield url, (future.result() or None)
+            except Exception as e:
+                print(f"Error scraping {url}: {e}")
+                yield url, None
+    except FutureTimeout:
+        pending = [url for future, url in futures.items() if not future.done()]
+        print(f"Scrape deadline of {deadline_seconds}s reached, skipping {len(pending)} articles")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def scrape_articles(urls: List[str], session: Optional[requests.Session] = None, **kwargs) -> dict:
+    """Returns {url: text} for every url scraped successfully before the deadline."""
+    return {url: text for url, text in iter_scraped_articles(urls, session, **kwargs) if text}
+
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
-def get_relevant_articles_from_prompt(prompt):
-    url = generate_alpha_vantage_url_from_prompt(prompt)
-    response = requests.get(url)
+def parse_time_published(time_published: Optional[str]) -> Optional[float]:
+    """Converts Alpha Vantage time_published (YYYYMMDDTHHMMSS) to a UTC epoch timestamp."""
+    if not time_published:
+        return None
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M"):
+        try:
+            return datetime.strptime(time_published, fmt).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def fetch_news_feed(url: str) -> Optional[List[dict]]:
+    """Fetches one NEWS_SENTIMENT page. Returns its feed items, or None when the call failed or was rate limited."""
+    with telemetry.span("alpha_vantage.news"):
+        response = resources.get("scrape_session").get(url, timeout=SCRAPE_TIMEOUT)
+    telemetry.incr("bytes_fetched_total", len(response.content), source="alpha_vantage")
 
     if response.status_code != 200:
         print(f"Error: Failed to fetch data. Status code: {response.status_code}")
-        return []
+        return None
 
     try:
         data = response.json()
     except ValueError:
         print("Error: Invalid JSON response")
-        return []
+        return None
+
+    if "feed" not in data:
+        # Rate limits and bad requests come back as 200 with an "Information"/"Note" message
+        print(f"Error: No feed in response: {data.get('Information') or data.get('Note') or data.get('Error Message')}")
+        return None
+    return data["feed"]
 
-    feed = data.get('feed', [])
-    all_docs = []
-    splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=30)
 
+def relevant_feed_items(feed: List[dict], min_relevance: float = 0.5) -> dict:
+    """Returns {url: (item, relevant tickers)} for items about at least one ticker with enough relevance."""
+    relevant_items = {}
     for item in feed:
         ticker_sentiment = item.get('ticker_sentiment', [])
-        if any(float(ts['relevance_score']) >= 0.5 for ts in ticker_sentiment):
-            url = item.get('url', '')
-            article_content = scrape_article_content(url)
-            if article_content:
-                chunks = splitter.create_documents([article_content])
-                all_docs.extend(chunks)
-
-    return all_docs
+        relevant = [ts['ticker'] for ts in ticker_sentiment if float(ts['relevance_score']) >= min_relevance]
+        if relevant and item.get('url'):
+            relevant_items[item['url']] = (item, relevant)
+    return relevant_items
+
+
+def iter_relevant_articles_from_prompt(prompt):
+    """Yields article chunk Documents as soon as each relevant article has been scraped."""
+    feed = fetch_news_feed(generate_alpha_vantage_url_from_prompt(prompt))
+    if feed:
+        yield from iter_article_documents(relevant_feed_items(feed))
+
+
+def iter_article_documents(relevant_items: dict):
+    """
+    Scrapes {url: (item, relevant tickers)} concurrently and yields chunk Documents per finished article.
+
+    Returns:
+        set: URLs that were scraped (failed, empty and deadline-skipped pages are missing)
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=30)
+    scraped = set()
+    for url, article_content in iter_scraped_articles(list(relevant_items)):
+        if article_content:
+            scraped.add(url)
+            item, relevant = relevant_items[url]
+            metadata = {
+                "source": url,
+                "source_type": "article",
+                "tickers": relevant,
+                "published_at": parse_time_published(item.get('time_published')),
+            }
+            yield from splitter.create_documents([article_content], metadatas=[metadata])
+    return scraped
+
+
+def get_relevant_articles_from_prompt(prompt):
+    return list(iter_relevant_articles_from_prompt(prompt))
 
 
 
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# TELEMETRY=0 turns every call below into a no-op; TELEMETRY_LOG=1 also emits one JSON log line per span
+TELEMETRY_ENABLED = os.getenv("TELEMETRY", "1") != "0"
+TELEMETRY_LOG = os.getenv("TELEMETRY_LOG", "0") == "1"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("financial_agent.telemetry")
+_lock = threading.Lock()
+# (metric name, sorted label pairs) -> value
+_counters: Dict[Tuple[str, Tuple], float] = {}
+# span name -> [bucket counts..., +Inf count, sum]
+_histograms: Dict[str, List[float]] = {}
+# name -> callable returning {metric name: value}, evaluated at scrape time (e.g. cache stats)
+_collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+
+def incr(name: str, value: float = 1, **labels) -> None:
+    """Adds value to a counter, e.g. incr("bytes_fetched_total", 512, source="article")."""
+    if not TELEMETRY_ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, seconds: float) -> None:
+    if not TELEMETRY_ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = [0] * (len(LATENCY_BUCKETS) + 2)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+
+
+@contextmanager
+def _span(name: str, attrs: Dict) -> Iterator[Dict]:
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attrs
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(name, elapsed)
+        if status == "error":
+            incr("span_errors_total", span=name)
+        if TELEMETRY_LOG:
+            logger.info(json.dumps({"span": name, "seconds": round(elapsed, 6), "status": status, **attrs}, default=str))
+
+
+def span(name: str, **attrs):
+    """
+    Times a block as one span. The yielded dict can be filled with attributes
+    (e.g. bytes, tickers) that end up in the structured log line.
+    """
+    if not TELEMETRY_ENABLED:
+        return nullcontext(attrs)
+    return _span(name, attrs)
+
+
+def traced(name: str):
+    """Decorator form of span."""
+    def decorator(fn):
+        if not TELEMETRY_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def register_collector(name: str, collect: Callable[[], Dict[str, float]]) -> None:
+    with _lock:
+        _collectors[name] = collect
+
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}"
+
+
+def render_prometheus() -> str:
+    """Renders every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {name: list(values) for name, values in _histograms.items()}
+        collectors = dict(_collectors)
+
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(f"financial_agent_{name}{_format_labels(labels)} {value}")
+
+    if histograms:
+        lines.append("# TYPE financial_agent_span_seconds histogram")
+    for name, values in sorted(histograms.items()):
+        for bound, count in zip(LATENCY_BUCKETS, values):
+            lines.append(f'financial_agent_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+        lines.append(f'financial_agent_span_seconds_bucket{{span="{name}",le="+Inf"}} {values[-2]}')
+        lines.append(f'financial_agent_span_seconds_count{{span="{name}"}} {values[-2]}')
+        lines.append(f'financial_agent_span_seconds_sum{{span="{name}"}} {values[-1]}')
+
+    for source, collect in sorted(collectors.items()):
+        try:
+            values = collect()
+        except Exception as e:
+            logger.warning("Metric collector %s failed: %s", source, e)
+            continue
+        for metric, value in sorted(values.items()):
+            if isinstance(value, (int, float)):
+                lines.append(f'financial_agent_{metric}{{source="{source}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> Dict[str, Dict]:
+    """Span counts and mean seconds, for quick inspection or JSON reports."""
+    with _lock:
+        return {
+            name: {"count": values[-2], "mean_seconds": values[-1] / values[-2] if values[-2] else 0.0}
+            for name, values in _histograms.items()
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def token_usage_handler():
+    """LangChain callback handler counting prompt/completion tokens per model."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenUsageHandler(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs) -> None:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            model = (response.llm_output or {}).get("model_name", "unknown")
+            prompt_tokens = usage.get("prompt_tokens")
+            completion_tokens = usage.get("completion_tokens")
+            if prompt_tokens is None:
+                # Streaming responses carry usage on the message instead
+                for generations in response.generations:
+                    for generation in generations:
+                        metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                        prompt_tokens = (prompt_tokens or 0) + metadata.get("input_tokens", 0)
+                        completion_tokens = (completion_tokens or 0) + metadata.get("output_tokens", 0)
+            incr("llm_calls_total", model=model)
+            incr("llm_prompt_tokens_total", prompt_tokens or 0, model=model)
+            incr("llm_completion_tokens_total", completion_tokens or 0, model=model)
+
+    return TokenUsageHandler()
+
+
+def llm_callbacks() -> Optional[list]:
+    """Callbacks to attach to LLM clients; None when telemetry is disabled."""
+    return [token_usage_handler()] if TELEMETRY_ENABLED else None
@@ -0,0 +1,166 @@
+import csv
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+# Built-in symbol -> company names; extended with TICKER_LIST_PATH (CSV with symbol,name columns)
+DEFAULT_TICKERS: Dict[str, List[str]] = {
+    "AAPL": ["apple"],
+    "MSFT": ["microsoft"],
+    "GOOGL": ["alphabet", "google"],
+    "AMZN": ["amazon"],
+    "META": ["meta platforms", "meta", "facebook"],
+    "NVDA": ["nvidia"],
+    "TSLA": ["tesla"],
+    "NFLX": ["netflix"],
+    "AMD": ["advanced micro devices"],
+    "INTC": ["intel"],
+    "IBM": ["ibm"],
+    "ORCL": ["oracle"],
+    "CRM": ["salesforce"],
+    "ADBE": ["adobe"],
+    "AVGO": ["broadcom"],
+    "QCOM": ["qualcomm"],
+    "CSCO": ["cisco"],
+    "UBER": ["uber"],
+    "PYPL": ["paypal"],
+    "JPM": ["jpmorgan", "jp morgan"],
+    "BAC": ["bank of america"],
+    "GS": ["goldman sachs"],
+    "MS": ["morgan stanley"],
+    "V": ["visa"],
+    "MA": ["mastercard"],
+    "BRK-B": ["berkshire hathaway", "berkshire"],
+    "WMT": ["walmart"],
+    "KO": ["coca cola", "coca-cola"],
+    "PEP": ["pepsico", "pepsi"],
+    "DIS": ["disney"],
+    "NKE": ["nike"],
+    "MCD": ["mcdonalds", "mcdonald's"],
+    "XOM": ["exxon", "exxonmobil", "exxon mobil"],
+    "CVX": ["chevron"],
+    "PFE": ["pfizer"],
+    "JNJ": ["johnson & johnson", "johnson and johnson"],
+    "BA": ["boeing"],
+    "TSM": ["tsmc", "taiwan semiconductor"],
+    "BABA": ["alibaba"],
+    "TCEHY": ["tencent"],
+    "SONY": ["sony"],
+    "TM": ["toyota"],
+    "ASIA50": ["asia 50"],
+    "HSI": ["hang seng"],
+    "KOSPI": ["kospi"],
+    "STI": ["straits times"],
+    "TAIEX": ["taiex"],
+}
+MAX_NAME_WORDS = 4
+# Symbols that are also everyday words ("IT", "NOW"); they only count when written as $SYMBOL
+AMBIGUOUS_SYMBOLS = {
+    "A", "AI", "ALL", "AN", "ARE", "AT", "BE", "BY", "CAN", "DO", "FOR", "GO", "HAS", "IN", "IS", "IT",
+    "META", "MS", "NEW", "NOW", "ON", "ONE", "OR", "OUT", "SEE", "SO", "TM", "TV", "US", "V", "YOU",
+}
+# Company names that are also everyday words ("visa card", "meta analysis", "uber rides").
+# They only count in a prompt that also has a market word, in any case ("stock data of apple").
+AMBIGUOUS_NAMES = {
+    "adobe", "alphabet", "amazon", "apple", "chevron", "google", "intel", "meta", "oracle", "shell",
+    "target", "uber", "visa",
+}
+MARKET_WORDS = {
+    "analyst", "analysts", "dividend", "dividends", "earnings", "equities", "equity", "exposure", "financials",
+    "forecast", "guidance", "invest", "investing", "investors", "market", "markets", "options", "outlook",
+    "portfolio", "price", "prices", "quarter", "rally", "revenue", "sector", "share", "shares", "stock",
+    "stocks", "ticker", "trading", "valuation",
+}
+
+SYMBOL_PATTERN = re.compile(r"(?<![\w$])\$?[A-Z][A-Z0-9]{0,5}(?:[.-][A-Z])?\b")
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9&'.-]+")
+COMPACT_TIME_PATTERN = re.compile(r"\b(20\d{2})(\d{2})(\d{2})T(\d{4})\b")
+ISO_DATE_PATTERN = re.compile(r"\b(20\d{2})-(\d{2})-(\d{2})\b")
+RELATIVE_PATTERN = re.compile(r"\b(?:last|past)\s+(\d+)\s+(day|week|month|year)s?\b")
+PERIOD_PATTERN = re.compile(r"\b(?:last|past|this)\s+(week|month|year)\b")
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def load_ticker_index(path: Optional[str] = None) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Returns (symbols, names): the set of known symbols and a lowercase company name -> symbol map."""
+    symbols = {symbol: symbol for symbol in DEFAULT_TICKERS}
+    names = {name: symbol for symbol, aliases in DEFAULT_TICKERS.items() for name in aliases}
+    if path and os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                symbol = (row.get("symbol") or "").strip().upper()
+                name = (row.get("name") or "").strip().lower()
+                if symbol:
+                    symbols[symbol] = symbol
+                    if name:
+                        names.setdefault(name, symbol)
+    return symbols, names
+
+
+KNOWN_SYMBOLS, COMPANY_NAMES = load_ticker_index(os.getenv("TICKER_LIST_PATH"))
+
+
+def name_matches(name: str, market_context: bool) -> bool:
+    """Dictionary-word names only count when the prompt is about markets."""
+    return name not in AMBIGUOUS_NAMES or market_context
+
+
+def extract_tickers(prompt: str) -> List[str]:
+    """
+    Finds ticker symbols in a prompt: uppercase known symbols or $-prefixed symbols,
+    and company names matched on whole word n-grams against the name index. Symbols and
+    names that double as everyday words need stronger evidence (see AMBIGUOUS_SYMBOLS
+    and AMBIGUOUS_NAMES).
+    """
+    found = []
+    for match in SYMBOL_PATTERN.finditer(prompt):
+        token = match.group(0)
+        symbol = token.lstrip("$")
+        if token.startswith("$") or (symbol in KNOWN_SYMBOLS and symbol not in AMBIGUOUS_SYMBOLS):
+            found.append(symbol)
+
+    words = [token.lower() for token in TOKEN_PATTERN.findall(prompt)]
+    market_context = any(word.strip(".'") in MARKET_WORDS for word in words)
+    i = 0
+    while i < len(words):
+        for size in range(min(MAX_NAME_WORDS, len(words) - i), 0, -1):
+            phrase = " ".join(words[i:i + size])
+            name = phrase if phrase in COMPANY_NAMES else phrase.rstrip(".").removesuffix("'s")
+            symbol = COMPANY_NAMES.get(name)
+            if symbol and name_matches(name, market_context):
+                found.append(symbol)
+                i += size - 1
+                break
+        i += 1
+    return list(dict.fromkeys(found))
+
+
+def get_default_time_from() -> str:
+    """Returns start date for the last 1 month in YYYYMMDDTHHMM format (UTC)"""
+    start_date = datetime.now(timezone.utc) - timedelta(days=30)
+    return start_date.strftime("%Y%m%dT%H%M")
+
+
+def extract_time_from(prompt: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Parses an explicit or relative start time into YYYYMMDDTHHMM (UTC), or None if absent."""
+    now = now or datetime.now(timezone.utc)
+    match = COMPACT_TIME_PATTERN.search(prompt)
+    if match:
+        return match.group(0)
+    match = ISO_DATE_PATTERN.search(prompt)
+    if match:
+        return f"{match.group(1)}{match.group(2)}{match.group(3)}T0000"
+
+    text = prompt.lower()
+    start = None
+    match = RELATIVE_PATTERN.search(text)
+    if match:
+        start = now - timedelta(days=int(match.group(1)) * UNIT_DAYS[match.group(2)])
+    elif PERIOD_PATTERN.search(text):
+        start = now - timedelta(days=UNIT_DAYS[PERIOD_PATTERN.search(text).group(1)])
+    elif "yesterday" in text:
+        start = (now - timedelta(days=1)).replace(hour=0, minute=0)
+    elif "today" in text:
+        start = now.replace(hour=0, minute=0)
+    return start.strftime("%Y%m%dT%H%M") if start else None
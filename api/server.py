@@ -0,0 +1,195 @@
+import sys
+import os
+
+# Add parent directory (project root) to sys.path before importing the orchestrator
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from agents import telemetry
+from agents.ticker_extractor import extract_tickers
+from orchestrator.manager import run_pipeline, stream_manager
+from data_ingestion.news_poller import start_news_poller
+
+# Pipelines executing at once (distinct prompts); identical prompts share one execution
+API_WORKERS = int(os.getenv("API_WORKERS", "4"))
+# Distinct executions admitted (running + waiting for a worker) before new ones get 429
+API_MAX_INFLIGHT = int(os.getenv("API_MAX_INFLIGHT", "16"))
+
+executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="pipeline")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keeps NEWS_WATCHLIST tickers ingested in the background so requests skip the scraping
+    poller = start_news_poller()
+    yield
+    if poller is not None:
+        poller.stop(timeout=5)
+
+
+app = FastAPI(title="Financial Agent", lifespan=lifespan)
+
+
+class ReportRequest(BaseModel):
+    prompt: str
+
+
+class ReportResponse(BaseModel):
+    report: str
+    audio: Optional[str] = None
+    tickers: List[str] = []
+    timings: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+    coalesced: bool = False
+    cached: bool = False
+
+
+def request_key(prompt: str) -> str:
+    """Normalized prompt + tickers, so trivially different phrasings of the same ask coalesce."""
+    normalized = " ".join(prompt.lower().split())
+    return f"{normalized}|{','.join(sorted(extract_tickers(prompt)))}"
+
+
+class SingleFlight:
+    """
+    Runs at most one execution per key at a time; callers arriving while it runs await the
+    same result instead of starting their own. New keys are refused once max_inflight
+    executions are admitted.
+    """
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"executions": 0, "coalesced": 0, "rejected": 0}
+
+    async def run(self, key: str, fn: Callable[[], Any]):
+        """Returns (result, coalesced)."""
+        if key in self._inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[key]), True
+        if len(self._inflight) >= self.max_inflight:
+            self.stats["rejected"] += 1
+            raise HTTPException(status_code=429, detail="Too many requests in flight, retry later.")
+
+        # The work is shared: every caller (the first one included) awaits it through a shield,
+        # so a disconnecting client neither cancels it for the others nor leaves them waiting
+        # on a result that never comes. The key is released when the work itself finishes.
+        task = asyncio.get_running_loop().run_in_executor(executor, fn)
+        self._inflight[key] = task
+        self.stats["executions"] += 1
+        task.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(task), False
+
+    def _release(self, key: str, done: asyncio.Future) -> None:
+        if self._inflight.get(key) is done:
+            del self._inflight[key]
+        if not done.cancelled():
+            done.exception()  # Mark retrieved when nobody else was waiting
+
+
+class StreamBroadcast:
+    """Token stream produced once in a worker thread and replayed to every subscriber."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self.condition = asyncio.Condition()
+
+    async def _update(self, token: Optional[str] = None, done: bool = False, error: Optional[str] = None):
+        async with self.condition:
+            if token is not None:
+                self.tokens.append(token)
+            self.done = self.done or done
+            self.error = error or self.error
+            self.condition.notify_all()
+
+    def produce(self, prompt: str) -> None:
+        # Runs in a worker thread. The stream endpoint only returns text, so no audio is made
+        try:
+            for token in stream_manager(prompt, audio=False):
+                asyncio.run_coroutine_threadsafe(self._update(token=token), self.loop).result()
+            asyncio.run_coroutine_threadsafe(self._update(done=True), self.loop).result()
+        except Exception as e:
+            asyncio.run_coroutine_threadsafe(self._update(done=True, error=str(e)), self.loop).result()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            async with self.condition:
+                await self.condition.wait_for(lambda: len(self.tokens) > index or self.done)
+                pending = self.tokens[index:]
+                finished = self.done
+                error = self.error
+            index += len(pending)
+            for token in pending:
+                yield token
+            if finished and index >= len(self.tokens):
+                if error:
+                    yield f"\n[error] {error}"
+                return
+
+
+report_flights = SingleFlight(API_MAX_INFLIGHT)
+streams: Dict[str, StreamBroadcast] = {}
+
+
+@app.post("/report", response_model=ReportResponse)
+async def report(request: ReportRequest) -> ReportResponse:
+    if not request.prompt.strip():
+        raise HTTPException(status_code=400, detail="Prompt must not be empty.")
+    result, coalesced = await report_flights.run(request_key(request.prompt), lambda: run_pipeline(request.prompt))
+    return ReportResponse(
+        report=result["report"],
+        audio=result["audio"],
+        tickers=result["tickers"],
+        timings=result["timings"],
+        errors=result["errors"],
+        coalesced=coalesced,
+        cached=result["cached"],
+    )
+
+
+@app.post("/report/stream")
+async def report_stream(request: ReportRequest) -> StreamingResponse:
+    if not request.prompt.strip():
+        raise HTTPException(status_code=400, detail="Prompt must not be empty.")
+    key = request_key(request.prompt)
+    broadcast = streams.get(key)
+    if broadcast is None:
+        if len(streams) >= API_MAX_INFLIGHT:
+            raise HTTPException(status_code=429, detail="Too many requests in flight, retry later.")
+        loop = asyncio.get_running_loop()
+        broadcast = StreamBroadcast(loop)
+        streams[key] = broadcast
+        task = loop.run_in_executor(executor, broadcast.produce, request.prompt)
+        task.add_done_callback(lambda _: streams.pop(key, None))
+    return StreamingResponse(broadcast.subscribe(), media_type="text/plain")
+
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "inflight": len(report_flights._inflight),
+        "streams": len(streams),
+        **report_flights.stats,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    """Prometheus scrape endpoint: span latency histograms, token, byte and cache counters."""
+    return telemetry.render_prometheus()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("API_HOST", "0.0.0.0"), port=int(os.getenv("API_PORT", "8000")))
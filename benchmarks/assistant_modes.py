@@ -0,0 +1,90 @@
+"""
+Compares the two run_financial_assistant modes on live services:
+
+    react  the ReAct agent calls get_data / yahoo_finance_news one tool per LLM turn
+    fast   tickers are resolved up front, both tools run in parallel, one LLM call answers
+
+Reports LLM call count and wall time per prompt and mode. Needs GROQ_API_KEY and network
+access to Yahoo Finance.
+
+Usage:
+    python benchmarks/assistant_modes.py --repeat 3 --output assistant_modes.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.callbacks import BaseCallbackHandler
+from agents.API_Agent import run_financial_assistant
+from agents.market_cache import market_cache
+
+PROMPTS = [
+    "What happened today with Microsoft stocks?",
+    "Compare Apple and NVDA over the last 3 months",
+    "How are TSLA, AMZN and GOOGL doing this week?",
+]
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+
+def measure(prompt: str, mode: str) -> dict:
+    # Cold market-data cache so both modes pay for the same upstream fetches
+    market_cache.invalidate()
+    counter = LLMCallCounter()
+    start = time.perf_counter()
+    error = None
+    try:
+        run_financial_assistant(prompt, mode=mode, callbacks=[counter])
+    except Exception as e:
+        error = str(e)
+    return {"llm_calls": counter.calls, "seconds": time.perf_counter() - start, "error": error}
+
+
+def run(repeat: int) -> dict:
+    results = []
+    for prompt in PROMPTS:
+        for mode in ("react", "fast"):
+            runs = [measure(prompt, mode) for _ in range(repeat)]
+            results.append({
+                "prompt": prompt,
+                "mode": mode,
+                "llm_calls_mean": statistics.mean(r["llm_calls"] for r in runs),
+                "seconds_median": statistics.median(r["seconds"] for r in runs),
+                "errors": [r["error"] for r in runs if r["error"]],
+            })
+    summary = {}
+    for mode in ("react", "fast"):
+        rows = [r for r in results if r["mode"] == mode]
+        summary[mode] = {
+            "llm_calls_mean": statistics.mean(r["llm_calls_mean"] for r in rows),
+            "seconds_median": statistics.median(r["seconds_median"] for r in rows),
+        }
+    return {"repeat": repeat, "results": results, "summary": summary}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,198 @@
+"""
+CPU embedding backend benchmark: docs/sec and retrieval agreement of the ONNX Runtime
+(fp32 and int8) backends against the sentence-transformers MiniLM the retriever uses by default.
+
+For every backend x thread count x batch size the corpus is encoded `--iterations` times
+after a warm-up batch. Retrieval quality is measured against the reference backend
+("hf" unless --reference says otherwise): each query's top-k passages by exact cosine
+similarity are compared with the reference's top-k (recall@k), and the cosine between
+each passage's two vectors is reported (1.0 = identical embeddings).
+
+Corpus: passages from a text file (one per line), the article pages of a
+benchmarks/pipeline.py fixture file, or deterministic synthetic text. Synthetic text
+gives valid throughput numbers but says little about recall; use real text for that.
+Queries are the opening words of --queries randomly chosen passages.
+
+Usage:
+    python benchmarks/embedding_backends.py --output embed.json
+    python benchmarks/embedding_backends.py --fixtures benchmarks/fixtures/pipeline.json --threads 1,4 --batch-sizes 16,64
+    python benchmarks/embedding_backends.py --corpus passages.txt --backends hf,onnx-int8 -k 5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import fakes
+from pipeline import git_commit, parse_ints, summarize
+from agents.embedding_backends import build_embeddings
+from agents.Retriever_Agent import encode_kwargs, model_kwargs, model_name
+
+TAG = re.compile(r"<[^>]+>")
+PASSAGE_CHARS = 300
+
+
+def split_passages(text: str, size: int = PASSAGE_CHARS) -> List[str]:
+    """Greedy word-boundary split, close to the retriever's 300-character chunks."""
+    passages, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > size:
+            passages.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        passages.append(current)
+    return passages
+
+
+def load_corpus(args) -> List[str]:
+    if args.corpus:
+        with open(args.corpus) as f:
+            passages = [line.strip() for line in f if line.strip()]
+    elif args.fixtures:
+        fixtures = fakes.Fixtures(args.fixtures)
+        passages = []
+        for key, response in fixtures.data["http"].items():
+            if not key.startswith("alpha_vantage:") and response.get("status") == 200:
+                passages.extend(split_passages(TAG.sub(" ", response.get("body") or "")))
+    else:
+        passages = [fakes.synthetic_text(50, fakes.seed_for("passage", str(i))) for i in range(args.docs)]
+    return passages[:args.docs]
+
+
+def make_queries(passages: List[str], count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    chosen = rng.sample(passages, min(count, len(passages)))
+    return [" ".join(passage.split()[:12]) for passage in chosen]
+
+
+def top_k(doc_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> List[set]:
+    scores = query_vectors @ doc_vectors.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+
+def bench_backend(backend: str, passages: List[str], queries: List[str], threads: int, batch_size: int,
+                  iterations: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    embeddings = build_embeddings(model_name, model_kwargs, encode_kwargs, backend=backend, threads=threads,
+                                  batch_size=batch_size)
+    embeddings.embed_documents(passages[:batch_size])
+    load_seconds = time.perf_counter() - started
+
+    seconds = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        doc_vectors = embeddings.embed_documents(passages)
+        seconds.append(time.perf_counter() - started)
+    query_seconds = []
+    query_vectors = []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        query_seconds.append(time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "threads": threads,
+        "batch_size": batch_size,
+        "load_seconds": round(load_seconds, 3),
+        "docs_per_second": round(len(passages) / statistics.median(seconds), 1),
+        "encode_seconds": summarize(seconds),
+        "query_seconds": summarize(query_seconds),
+        "doc_vectors": np.asarray(doc_vectors, dtype=np.float32),
+        "query_vectors": np.asarray(query_vectors, dtype=np.float32),
+    }
+
+
+def agreement(result: Dict[str, Any], reference: Dict[str, Any], k: int) -> Dict[str, Any]:
+    ours = top_k(result["doc_vectors"], result["query_vectors"], k)
+    theirs = top_k(reference["doc_vectors"], reference["query_vectors"], k)
+    recalls = [len(a & b) / len(b) for a, b in zip(ours, theirs) if b]
+    cosines = np.sum(result["doc_vectors"] * reference["doc_vectors"], axis=1)
+    return {
+        f"recall_at_{k}": round(statistics.mean(recalls), 4) if recalls else None,
+        "exact_top_k_queries": sum(1 for a, b in zip(ours, theirs) if a == b),
+        "doc_cosine_mean": round(float(cosines.mean()), 5),
+        "doc_cosine_min": round(float(cosines.min()), 5),
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    passages = load_corpus(args)
+    if not passages:
+        raise SystemExit("Empty corpus")
+    queries = make_queries(passages, args.queries, args.seed)
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if args.reference not in backends:
+        backends.insert(0, args.reference)
+
+    results = []
+    references: Dict[str, Any] = {}
+    for backend in backends:
+        for threads in parse_ints(args.threads):
+            for batch_size in parse_ints(args.batch_sizes):
+                print(f"Encoding {len(passages)} passages: {backend} threads={threads} batch={batch_size}", file=sys.stderr)
+                results.append(bench_backend(backend, passages, queries, threads, batch_size, args.iterations))
+                if backend == args.reference:
+                    references.setdefault("vectors", results[-1])
+
+    baseline = {(r["threads"], r["batch_size"]): r["docs_per_second"] for r in results if r["backend"] == args.reference}
+    for result in results:
+        result.update(agreement(result, references["vectors"], args.k))
+        reference_rate = baseline.get((result["threads"], result["batch_size"]))
+        result["speedup"] = round(result["docs_per_second"] / reference_rate, 3) if reference_rate else None
+    for result in results:
+        del result["doc_vectors"], result["query_vectors"]
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "model": model_name,
+            "corpus": args.corpus or args.fixtures or "synthetic",
+            "passages": len(passages),
+            "mean_passage_chars": round(statistics.mean(len(p) for p in passages), 1),
+            "queries": len(queries),
+            "k": args.k,
+            "reference": args.reference,
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Text file with one passage per line")
+    parser.add_argument("--fixtures", help="Use the article pages of a pipeline fixture file as the corpus")
+    parser.add_argument("--docs", type=int, default=1000, help="Maximum number of passages")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=5, help="Top-k compared for recall (the retriever's RETRIEVAL_K)")
+    parser.add_argument("--backends", default="hf,onnx,onnx-int8")
+    parser.add_argument("--reference", default="hf", help="Backend the others are compared with")
+    parser.add_argument("--threads", default="1,4", help="Thread counts (0 = library default)")
+    parser.add_argument("--batch-sizes", default="32")
+    parser.add_argument("--iterations", type=int, default=3, help="Timed encodes of the whole corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args), indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
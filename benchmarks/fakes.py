@@ -0,0 +1,635 @@
+"""
+Offline stand-ins for the services the pipeline talks to, plus record/replay fixtures.
+
+Every stand-in sleeps for a configurable, jittered latency and serves either recorded
+fixture data or deterministic synthetic data, so benchmark numbers depend only on the
+code under test and the latency profile:
+
+    FakeLLM          resources "groq_llm"        invoke / stream
+    FakeSession      resources "scrape_session"  Alpha Vantage feed + article HTML
+    FakeNewsTool     resources "yahoo_news_tool" Yahoo Finance news text
+    FakeYFinance     agents.API_Agent.yf         Ticker / download
+    FakeEmbeddings   resources "embeddings"      hashed bag-of-words vectors
+    FakeTTSBackend   resources "tts_backend"     writes placeholder audio
+    FakeSTTBackend   resources "stt_backend"     fixed transcript per audio segment
+
+install() registers them; install(record=True) instead wraps the real clients and stores
+what they return in the Fixtures object, to be replayed later with install(fixtures=...).
+"""
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+# Seconds per call (or per unit for *_token / embed_doc) before jitter and scaling
+DEFAULT_LATENCY = {
+    "llm_first_token": 0.35,
+    "llm_token": 0.004,
+    "alpha_vantage": 0.3,
+    "article": 0.15,
+    "news": 0.12,
+    "yfinance": 0.15,
+    "embed_batch": 0.02,
+    "embed_doc": 0.0015,
+    "tts": 0.06,
+    "stt": 0.2,
+}
+PERIOD_ROWS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "max": 2520}
+EMBEDDING_DIM = 384
+ANSWER_WORDS = 400
+ARTICLE_PARAGRAPHS = 6
+ARTICLES_PER_TICKER = 4
+
+WORDS = (
+    "shares rose fell percent quarter revenue guidance analysts margin cloud demand chips "
+    "earnings outlook buyback dividend volatility investors rally selloff forecast growth "
+    "segment pricing supply regulators valuation momentum consensus upgrade downgrade"
+).split()
+
+
+class Latency:
+    """
+    Injected service latency: base seconds * scale, multiplied by log-normal jitter so
+    the stand-ins have realistic tails. Seeded so runs are repeatable.
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, float]] = None, scale: float = 1.0,
+                 jitter: float = 0.25, seed: int = 0):
+        self.values = {**DEFAULT_LATENCY, **(overrides or {})}
+        self.scale = scale
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, key: str, units: float = 1.0) -> None:
+        base = self.values.get(key, 0.0) * units * self.scale
+        if base <= 0:
+            return
+        with self._lock:
+            factor = self._rng.lognormvariate(0.0, self.jitter) if self.jitter > 0 else 1.0
+        time.sleep(base * factor)
+
+    def config(self) -> Dict[str, Any]:
+        return {"values": self.values, "scale": self.scale, "jitter": self.jitter}
+
+
+class Fixtures:
+    """
+    Recorded service responses, stored as one JSON file:
+
+        http     "alpha_vantage:<TICKERS>" or article URL -> {status, headers, body}
+        news     query -> text
+        history  "<SYMBOL>:<period>" -> DataFrame (split orient JSON)
+        price    symbol -> float
+        options  symbol -> {expiration_date, calls, puts}
+        llm      list of generated texts, replayed round-robin
+    """
+
+    SECTIONS = ("http", "news", "history", "price", "options")
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.data: Dict[str, Any] = {section: {} for section in self.SECTIONS}
+        self.data["llm"] = []
+        self._lock = threading.Lock()
+        self._llm_index = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                loaded = json.load(f)
+            for section in self.SECTIONS:
+                self.data[section].update(loaded.get(section, {}))
+            self.data["llm"] = list(loaded.get("llm", []))
+
+    def get(self, section: str, key: str) -> Any:
+        return self.data[section].get(key)
+
+    def put(self, section: str, key: str, value: Any) -> None:
+        with self._lock:
+            self.data[section][key] = value
+
+    def add_llm(self, text: str) -> None:
+        with self._lock:
+            self.data["llm"].append(text)
+
+    def next_llm(self) -> Optional[str]:
+        with self._lock:
+            if not self.data["llm"]:
+                return None
+            text = self.data["llm"][self._llm_index % len(self.data["llm"])]
+            self._llm_index += 1
+            return text
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            with open(path, "w") as f:
+                json.dump(self.data, f)
+
+    def summary(self) -> Dict[str, int]:
+        return {section: len(values) for section, values in self.data.items()}
+
+
+def frame_to_json(frame: pd.DataFrame) -> str:
+    return frame.to_json(orient="split", date_format="iso")
+
+
+def frame_from_json(text: str) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(text), orient="split")
+
+
+def seed_for(*parts: str) -> int:
+    return zlib.crc32(":".join(parts).encode("utf-8"))
+
+
+def synthetic_text(words: int, seed: int) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 18))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def synthetic_history(symbol: str, period: str) -> pd.DataFrame:
+    rows = PERIOD_ROWS.get(period, 126)
+    rng = np.random.default_rng(seed_for(symbol, period))
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, rows))) * (1 + seed_for(symbol) % 400 / 100)
+    open_ = close * (1 + rng.normal(0, 0.005, rows))
+    index = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=rows)
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, rows))),
+        "Low": np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, rows))),
+        "Close": close,
+        "Adj Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, rows),
+    }, index=index)
+
+
+def synthetic_chain(symbol: str, price: float, side: str) -> pd.DataFrame:
+    rng = np.random.default_rng(seed_for(symbol, side))
+    strikes = np.round(price * np.linspace(0.7, 1.3, 40), 1)
+    return pd.DataFrame({
+        "contractSymbol": [f"{symbol}{side[0].upper()}{i:04d}" for i in range(len(strikes))],
+        "strike": strikes,
+        "lastPrice": np.abs(rng.normal(5, 2, len(strikes))),
+        "bid": np.abs(rng.normal(5, 2, len(strikes))),
+        "ask": np.abs(rng.normal(5, 2, len(strikes))),
+        "volume": rng.integers(0, 5000, len(strikes)),
+        "openInterest": rng.integers(0, 20000, len(strikes)),
+        "impliedVolatility": np.abs(rng.normal(0.35, 0.1, len(strikes))),
+    })
+
+
+def synthetic_feed(tickers: List[str], articles_per_ticker: int = ARTICLES_PER_TICKER) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    feed = []
+    for ticker in tickers:
+        for i in range(articles_per_ticker):
+            feed.append({
+                "title": f"{ticker} update {i}",
+                "url": f"https://news{i % 4}.example.com/{ticker.lower()}/{i}",
+                "time_published": (now - timedelta(hours=i + 1)).strftime("%Y%m%dT%H%M%S"),
+                "ticker_sentiment": [{"ticker": ticker, "relevance_score": "0.8", "ticker_sentiment_score": "0.1"}],
+            })
+    return {"items": str(len(feed)), "feed": feed}
+
+
+def synthetic_article(url: str, paragraphs: int = ARTICLE_PARAGRAPHS) -> str:
+    body = "".join(f"<p>{synthetic_text(45, seed_for(url, str(i)))}</p>" for i in range(paragraphs))
+    return f"<html><head><title>{url}</title></head><body><nav>Menu</nav>{body}</body></html>"
+
+
+def alpha_vantage_key(url: str) -> Optional[str]:
+    parts = urlsplit(url)
+    if "alphavantage.co" not in parts.netloc:
+        return None
+    tickers = parse_qs(parts.query).get("tickers", [""])[0]
+    return f"alpha_vantage:{tickers.upper()}"
+
+
+class FakeResponse:
+    def __init__(self, url: str, status_code: int = 200, body: str = "", headers: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.status_code = status_code
+        self.text = body
+        self.content = body.encode("utf-8")
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class FakeSession:
+    """requests.Session stand-in serving the Alpha Vantage feed and article pages."""
+
+    def __init__(self, fixtures: Fixtures, latency: Latency,
+                 articles_per_ticker: int = ARTICLES_PER_TICKER, paragraphs: int = ARTICLE_PARAGRAPHS):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.articles_per_ticker = articles_per_ticker
+        self.paragraphs = paragraphs
+        self.headers: Dict[str, str] = {}
+
+    def get(self, url: str, timeout: Optional[float] = None, headers: Optional[Dict[str, str]] = None, **kwargs):
+        feed_key = alpha_vantage_key(url)
+        if feed_key:
+            self.latency.sleep("alpha_vantage")
+            recorded = self.fixtures.get("http", feed_key)
+            if recorded:
+                return FakeResponse(url, recorded["status"], recorded["body"], recorded.get("headers"))
+            tickers = [t for t in feed_key.split(":", 1)[1].split(",") if t]
+            return FakeResponse(url, 200, json.dumps(synthetic_feed(tickers, self.articles_per_ticker)))
+
+        self.latency.sleep("article")
+        recorded = self.fixtures.get("http", url)
+        if recorded:
+            status, body, response_headers = recorded["status"], recorded["body"], recorded.get("headers") or {}
+        else:
+            status, body = 200, synthetic_article(url, self.paragraphs)
+            response_headers = {"ETag": f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'}
+        etag = response_headers.get("ETag")
+        if etag and (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(url, 304, "", response_headers)
+        return FakeResponse(url, status, body, response_headers)
+
+
+class FakeNewsTool:
+    def __init__(self, fixtures: Fixtures, latency: Latency):
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def run(self, query: str) -> str:
+        self.latency.sleep("news")
+        recorded = self.fixtures.get("news", query.strip().upper())
+        if recorded is not None:
+            return recorded
+        return "\n\n".join(synthetic_text(60, seed_for(query, str(i))) for i in range(5))
+
+
+class FakeTicker:
+    def __init__(self, yf: "FakeYFinance", symbol: str):
+        self.yf = yf
+        self.symbol = symbol
+
+    def history(self, period: str = "1mo", **kwargs) -> pd.DataFrame:
+        self.yf.latency.sleep("yfinance")
+        return self.yf.history(self.symbol, period)
+
+    @property
+    def fast_info(self) -> Dict[str, float]:
+        self.yf.latency.sleep("yfinance")
+        return {"last_price": self.yf.price(self.symbol)}
+
+    @property
+    def info(self) -> Dict[str, float]:
+        return {"regularMarketPrice": self.yf.price(self.symbol)}
+
+    @property
+    def options(self):
+        recorded = self.yf.fixtures.get("options", self.symbol)
+        if recorded:
+            return (recorded["expiration_date"],)
+        return ((datetime.now(timezone.utc) + timedelta(days=7)).strftime("%Y-%m-%d"),)
+
+    def option_chain(self, expiry: str):
+        self.yf.latency.sleep("yfinance")
+        recorded = self.yf.fixtures.get("options", self.symbol)
+        if recorded:
+            return SimpleNamespace(calls=frame_from_json(recorded["calls"]), puts=frame_from_json(recorded["puts"]))
+        price = self.yf.price(self.symbol)
+        return SimpleNamespace(
+            calls=synthetic_chain(self.symbol, price, "calls"),
+            puts=synthetic_chain(self.symbol, price, "puts"),
+        )
+
+
+class FakeYFinance:
+    """Replaces the yfinance module inside agents.API_Agent."""
+
+    def __init__(self, fixtures: Fixtures, latency: Latency):
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def Ticker(self, symbol: str, **kwargs) -> FakeTicker:
+        return FakeTicker(self, symbol)
+
+    def history(self, symbol: str, period: str) -> pd.DataFrame:
+        recorded = self.fixtures.get("history", f"{symbol}:{period}")
+        if recorded:
+            return frame_from_json(recorded)
+        return synthetic_history(symbol, period)
+
+    def price(self, symbol: str) -> float:
+        recorded = self.fixtures.get("price", symbol)
+        if recorded is not None:
+            return recorded
+        return float(self.history(symbol, "5d")["Close"].iloc[-1])
+
+    def download(self, symbols, period: str = "1mo", group_by: str = "ticker", **kwargs) -> pd.DataFrame:
+        # One round trip for the whole batch, like the real multi-ticker download
+        self.latency.sleep("yfinance")
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        return pd.concat({symbol: self.history(symbol, period) for symbol in symbols}, axis=1)
+
+
+class FakeLLM:
+    """
+    Chat model stand-in with invoke and stream. Replays recorded answers round-robin, or
+    generates answer_words of filler. Counts calls and prompt characters.
+    """
+
+    def __init__(self, fixtures: Fixtures, latency: Latency, answer_words: int = ANSWER_WORDS):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.answer_words = answer_words
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _answer(self, prompt: Any) -> str:
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(text)
+        return self.fixtures.next_llm() or synthetic_text(self.answer_words, seed_for(text[:200]))
+
+    def invoke(self, prompt: Any, config: Any = None, **kwargs):
+        text = self._answer(prompt)
+        tokens = len(text.split())
+        self.latency.sleep("llm_first_token")
+        self.latency.sleep("llm_token", tokens)
+        return SimpleNamespace(content=text, tool_calls=[])
+
+    def stream(self, prompt: Any, config: Any = None, **kwargs):
+        text = self._answer(prompt)
+        self.latency.sleep("llm_first_token")
+        for word in text.split(" "):
+            self.latency.sleep("llm_token")
+            yield SimpleNamespace(content=word + " ")
+
+    def reset_counters(self) -> Dict[str, int]:
+        with self._lock:
+            counters = {"calls": self.calls, "prompt_chars": self.prompt_chars}
+            self.calls = 0
+            self.prompt_chars = 0
+        return counters
+
+
+class FakeEmbeddings:
+    """Hashed bag-of-words vectors: cheap, deterministic and still meaningful for similarity search."""
+
+    def __init__(self, latency: Latency, dim: int = EMBEDDING_DIM):
+        self.latency = latency
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.latency.sleep("embed_batch")
+        self.latency.sleep("embed_doc", len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.latency.sleep("embed_batch")
+        return self._vector(text)
+
+
+class FakeTTSBackend:
+    name = "fake"
+    extension = "mp3"
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def synthesize(self, text: str, output_path: str) -> None:
+        self.latency.sleep("tts")
+        with open(output_path, "wb") as f:
+            f.write(b"\xff\xfb" + hashlib.sha1(text.encode("utf-8")).digest())
+
+
+class FakeSTTBackend:
+    name = "fake"
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def transcribe(self, audio: Any) -> str:
+        self.latency.sleep("stt")
+        return "How are AAPL and MSFT doing this week?"
+
+
+class RecordingSession:
+    def __init__(self, session, fixtures: Fixtures):
+        self.session = session
+        self.fixtures = fixtures
+        self.headers = session.headers
+
+    def get(self, url: str, **kwargs):
+        response = self.session.get(url, **kwargs)
+        if response.status_code != 304:
+            headers = {k: v for k, v in response.headers.items() if k in ("ETag", "Last-Modified")}
+            record = {"status": response.status_code, "body": response.text, "headers": headers}
+            self.fixtures.put("http", alpha_vantage_key(url) or url, record)
+        return response
+
+
+class RecordingNewsTool:
+    def __init__(self, tool, fixtures: Fixtures):
+        self.tool = tool
+        self.fixtures = fixtures
+
+    def run(self, query: str) -> str:
+        text = self.tool.run(query)
+        self.fixtures.put("news", query.strip().upper(), text)
+        return text
+
+
+class RecordingTicker:
+    def __init__(self, ticker, fixtures: Fixtures):
+        self.ticker = ticker
+        self.symbol = ticker.ticker
+        self.fixtures = fixtures
+
+    def history(self, period: str = "1mo", **kwargs):
+        frame = self.ticker.history(period=period, **kwargs)
+        self.fixtures.put("history", f"{self.symbol}:{period}", frame_to_json(frame))
+        return frame
+
+    @property
+    def fast_info(self):
+        info = self.ticker.fast_info
+        price = info.get("last_price")
+        if isinstance(price, (int, float)):
+            self.fixtures.put("price", self.symbol, float(price))
+        return info
+
+    @property
+    def info(self):
+        return self.ticker.info
+
+    @property
+    def options(self):
+        return self.ticker.options
+
+    def option_chain(self, expiry: str):
+        chain = self.ticker.option_chain(expiry)
+        self.fixtures.put("options", self.symbol, {
+            "expiration_date": expiry,
+            "calls": frame_to_json(chain.calls),
+            "puts": frame_to_json(chain.puts),
+        })
+        return chain
+
+
+class RecordingYFinance:
+    def __init__(self, yf, fixtures: Fixtures):
+        self.yf = yf
+        self.fixtures = fixtures
+
+    def Ticker(self, symbol: str, **kwargs) -> RecordingTicker:
+        return RecordingTicker(self.yf.Ticker(symbol, **kwargs), self.fixtures)
+
+    def download(self, symbols, period: str = "1mo", **kwargs):
+        frame = self.yf.download(symbols, period=period, **kwargs)
+        if frame.columns.nlevels > 1:
+            for symbol in set(frame.columns.get_level_values(0)):
+                self.fixtures.put("history", f"{symbol}:{period}", frame_to_json(frame[symbol].dropna(how="all")))
+        return frame
+
+
+class RecordingLLM:
+    def __init__(self, llm, fixtures: Fixtures):
+        self.llm = llm
+        self.fixtures = fixtures
+
+    def invoke(self, prompt: Any, config: Any = None, **kwargs):
+        response = self.llm.invoke(prompt, config=config, **kwargs)
+        if isinstance(response.content, str) and response.content:
+            self.fixtures.add_llm(response.content)
+        return response
+
+    def stream(self, prompt: Any, config: Any = None, **kwargs):
+        parts = []
+        for chunk in self.llm.stream(prompt, config=config, **kwargs):
+            parts.append(chunk.content or "")
+            yield chunk
+        self.fixtures.add_llm("".join(parts))
+
+    def bind_tools(self, *args, **kwargs):
+        return self.llm.bind_tools(*args, **kwargs)
+
+
+def install(workdir: str, fixtures: Optional[Fixtures] = None, latency: Optional[Latency] = None,
+            record: bool = False, articles_per_ticker: int = ARTICLES_PER_TICKER,
+            answer_words: int = ANSWER_WORDS) -> Dict[str, Any]:
+    """
+    Wires the stand-ins into the agents. Must run before any pipeline call; the env vars
+    for on-disk caches must already point into workdir (see set_environment).
+
+    Returns:
+        dict: The installed fakes by name ("llm", "session", ...), for counters and inspection
+    """
+    from agents import API_Agent, resources, scrapping_Agent
+    # Every module that registers a real factory at import time has to be imported before
+    # the fakes are registered, or a later first import silently swaps the real one back in
+    import orchestrator.manager  # noqa: F401 (imports the agents and data_ingestion modules)
+
+    fixtures = fixtures or Fixtures()
+    latency = latency or Latency()
+    installed: Dict[str, Any] = {"fixtures": fixtures, "latency": latency}
+
+    if record:
+        llm = RecordingLLM(resources.build_groq_llm(), fixtures)
+        session = RecordingSession(scrapping_Agent.build_session(), fixtures)
+        news_tool = RecordingNewsTool(API_Agent.build_yahoo_news_tool(), fixtures)
+        API_Agent.yf = RecordingYFinance(API_Agent.yf, fixtures)
+    else:
+        llm = FakeLLM(fixtures, latency, answer_words)
+        session = FakeSession(fixtures, latency, articles_per_ticker)
+        news_tool = FakeNewsTool(fixtures, latency)
+        API_Agent.yf = FakeYFinance(fixtures, latency)
+    embeddings = FakeEmbeddings(latency)
+    tts_backend = FakeTTSBackend(latency)
+    stt_backend = FakeSTTBackend(latency)
+
+    resources.register("groq_llm", lambda: llm)
+    resources.register("scrape_session", lambda: session)
+    resources.register("yahoo_news_tool", lambda: news_tool)
+    resources.register("embeddings", lambda: embeddings)
+    resources.register("tts_backend", lambda: tts_backend)
+    resources.register("stt_backend", lambda: stt_backend)
+    installed.update(
+        llm=llm, session=session, news_tool=news_tool, embeddings=embeddings, tts_backend=tts_backend,
+        stt_backend=stt_backend,
+    )
+    reset_state(workdir)
+    return installed
+
+
+_state_generation = 0
+
+
+def reset_state(workdir: str) -> None:
+    """Starts from empty caches and an empty vector store (in a fresh directory under workdir)."""
+    global _state_generation
+    from agents import resources, scrapping_Agent
+    from agents.answer_cache import answer_cache
+    from agents.article_cache import ArticleCache
+    from agents.embedding_cache import EmbeddingCache
+    from agents.market_cache import market_cache
+    from agents.Retriever_Agent import build_vector_store, model_name
+    from data_ingestion import news_poller
+
+    _state_generation += 1
+    directory = os.path.join(workdir, f"state_{_state_generation}")
+
+    resources.register("vector_store", lambda: build_vector_store(os.path.join(directory, "chroma")))
+    resources.register("embedding_cache", lambda: EmbeddingCache(os.path.join(directory, "embedding_cache.sqlite3"), model_name))
+    resources.register("article_cache", lambda: ArticleCache(os.path.join(directory, "articles.sqlite3")))
+    resources.register(
+        "news_watermarks", lambda: news_poller.NewsWatermarks(os.path.join(directory, "news_watermarks.sqlite3"))
+    )
+    with scrapping_Agent.url_variables_memo_lock:
+        scrapping_Agent.url_variables_memo.clear()
+    market_cache.invalidate()
+    answer_cache.invalidate()
+
+
+def set_environment(workdir: str) -> None:
+    """Points every on-disk cache and output directory into workdir. Call before importing agents."""
+    os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "benchmark")
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["VECTOR_STORE_DIR"] = os.path.join(workdir, "chroma")
+    os.environ["ARTICLE_CACHE_DB"] = os.path.join(workdir, "articles.sqlite3")
+    os.environ["NEWS_WATERMARK_DB"] = os.path.join(workdir, "news_watermarks.sqlite3")
+    os.environ["TTS_OUTPUT_DIR"] = os.path.join(workdir, "output")
+    os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "output", "tts_cache")
+    os.environ.pop("MARKET_CACHE_DB", None)
@@ -0,0 +1,142 @@
+"""
+Memory benchmark for the ingestion stage (data_ingestion.data_collection -> embed_chunk_stream).
+
+Each chunk count runs in its own process, so peak RSS is measured per run. The process
+pushes one request through orchestrator.manager.collect_context: the same producer threads,
+bounded queue (EMBED_QUEUE_SIZE) and batched embed_chunk_stream as a real request. Only the
+network-bound sources are replaced. The ReAct assistant and the article scraper yield
+fixed-size stand-ins, and the embeddings, LLM and sessions are the zero-latency stand-ins
+from benchmarks/fakes.py. Chroma, the embedding cache and the splitters are real.
+
+Article chunks cycle through --distinct texts. After the first pass they exercise the
+metadata refresh path rather than growing the store, so what remains is the memory
+held by the stream itself. With back-pressure that is bounded by the queue and batch
+sizes. If anything buffered the whole stream, peak RSS would grow with the chunk count.
+The run fails (exit status 1) when the peak RSS of the largest count exceeds that of the
+smallest by more than --max-growth-mb.
+
+Usage:
+    python benchmarks/memory_data_collection.py
+    python benchmarks/memory_data_collection.py --chunks 1000,10000,40000 --output memory.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import fakes
+
+CHUNK_CHARS = 300
+ASSISTANT_TEXT = ("Microsoft shares rose 1.2% today after strong cloud revenue. " * 40 + "\n\n") * 5
+# No ticker in the prompt, so articles come from the (stubbed) prompt scraper, not the news poller
+PROMPT = "Summarize the latest market news"
+WARM_UP_CHUNKS = 100
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def article_stream(chunks: int, distinct: int):
+    """Yields `chunks` article Documents of CHUNK_CHARS each, built on demand."""
+    from langchain_core.documents import Document
+    for i in range(chunks):
+        key = i % distinct
+        text = f"Article {key}: " + fakes.synthetic_text(60, key)
+        yield Document(
+            page_content=text[:CHUNK_CHARS],
+            metadata={"source": f"https://example.com/{key}", "source_type": "article", "tickers": ["AAPL"]},
+        )
+
+
+def measure(chunks: int, distinct: int) -> dict:
+    """Child process: one collect_context run over `chunks` article chunks."""
+    workdir = tempfile.mkdtemp(prefix="memory_bench_")
+    fakes.set_environment(workdir)
+    fakes.install(workdir, latency=fakes.Latency(scale=0))
+    from data_ingestion import data_collection
+    from orchestrator import manager
+
+    data_collection.run_financial_assistant = lambda prompt: ASSISTANT_TEXT
+
+    def ingest(count: int) -> float:
+        data_collection.iter_relevant_articles_from_prompt = lambda prompt: article_stream(count, distinct)
+        errors = {}
+        started = time.perf_counter()
+        manager.collect_context(PROMPT, manager.StageTimer(), errors)
+        if errors:
+            raise RuntimeError(f"Ingestion failed: {errors}")
+        return time.perf_counter() - started
+
+    # Chroma, the splitters and the caches allocate on first use; keep that out of the comparison
+    ingest(WARM_UP_CHUNKS)
+    warm_rss = peak_rss_bytes()
+    seconds = ingest(chunks)
+    from agents.Retriever_Agent import get_vector_store
+    return {
+        "chunks": chunks,
+        "stored_chunks": get_vector_store()._collection.count(),
+        "seconds": round(seconds, 3),
+        "chunks_per_second": round(chunks / seconds, 1) if seconds else None,
+        "warm_peak_rss_bytes": warm_rss,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def run(chunk_counts, distinct: int, max_growth_mb: float) -> dict:
+    results = []
+    for chunks in chunk_counts:
+        print(f"Ingesting {chunks} chunks", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure", str(chunks), "--distinct", str(distinct)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    growth = results[-1]["peak_rss_bytes"] - results[0]["peak_rss_bytes"]
+    return {
+        "config": {
+            "chunk_counts": chunk_counts,
+            "distinct": distinct,
+            "chunk_chars": CHUNK_CHARS,
+            "max_growth_mb": max_growth_mb,
+        },
+        "results": results,
+        "peak_rss_growth_bytes": growth,
+        "peak_rss_growth_per_1k_chunks_bytes": round(growth / max(1, chunk_counts[-1] - chunk_counts[0]) * 1000),
+        "flat": growth <= max_growth_mb * 1024 * 1024,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", default="1000,5000,20000", help="Article chunk counts, one process each")
+    parser.add_argument("--distinct", type=int, default=500, help="Distinct article chunk texts")
+    parser.add_argument("--max-growth-mb", type=float, default=8.0,
+                        help="Allowed peak RSS growth between the smallest and largest chunk count")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--measure", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        print(json.dumps(measure(args.measure, args.distinct)))
+        sys.exit(0)
+
+    chunk_counts = sorted(int(c) for c in args.chunks.split(",") if c.strip())
+    report = run(chunk_counts, args.distinct, args.max_growth_mb)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if not report["flat"]:
+        print(f"Peak RSS grew by {report['peak_rss_growth_bytes'] / 2 ** 20:.1f} MB "
+              f"(limit {args.max_growth_mb} MB)", file=sys.stderr)
+        sys.exit(1)
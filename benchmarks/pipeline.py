@@ -0,0 +1,373 @@
+"""
+Offline latency/throughput benchmark for the whole pipeline and its main components.
+
+Groq, Yahoo Finance, Alpha Vantage, the article sites, the embedding model and TTS are
+replaced by the stand-ins in benchmarks/fakes.py (injected, jittered latency; recorded
+fixtures or deterministic synthetic data), so results are reproducible and comparable
+between commits. Chroma, the caches, the scraper, the splitters, the indicator code and
+the orchestrator are the real implementations.
+
+Measured:
+    get_data          fetch_market_data at each ticker count (cold market cache)
+    articles          get_relevant_articles_from_prompt at each ticker count (cold article cache)
+    embed_retrieve    embed_chunks + get_chunks at each chunk count (empty store)
+    end_to_end        run_pipeline at each ticker count x concurrency level; per-stage
+                      p50/p95/p99 from the pipeline's own stage timings, plus throughput
+
+Usage:
+    # Replay (default: synthetic data when no fixture file is given)
+    python benchmarks/pipeline.py --output bench.json
+    python benchmarks/pipeline.py --fixtures benchmarks/fixtures/pipeline.json --tickers 1,3,8 --concurrency 1,4,8
+
+    # Record fixtures against the live services (needs GROQ_API_KEY, ALPHA_VANTAGE_API_KEY, network)
+    python benchmarks/pipeline.py --record benchmarks/fixtures/pipeline.json --tickers 1,3
+
+    # Compare two reports
+    python benchmarks/pipeline.py --compare before.json after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import fakes
+
+SYMBOL_POOL = [
+    "AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "NFLX", "AMD", "INTC",
+    "ORCL", "CRM", "ADBE", "AVGO", "QCOM", "CSCO", "UBER", "PYPL", "JPM", "BAC",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear interpolation between closest ranks (q in [0, 100])."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(statistics.mean(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def symbols_for(count: int, offset: int = 0) -> List[str]:
+    return [SYMBOL_POOL[(offset + i) % len(SYMBOL_POOL)] for i in range(count)]
+
+
+def prompt_for(symbols: List[str]) -> str:
+    return f"How are {', '.join(symbols)} doing over the last 3 months?"
+
+
+def timed_runs(fn: Callable[[int], Any], iterations: int, before: Callable[[], None] = None) -> Dict[str, Any]:
+    """Runs fn(i) sequentially, calling before() first each time. Returns latency summary and errors."""
+    latencies, errors, outputs = [], [], []
+    for i in range(iterations):
+        if before:
+            before()
+        start = time.perf_counter()
+        try:
+            outputs.append(fn(i))
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+    return {
+        "latency": summarize(latencies), "errors": errors[:5], "error_count": len(errors), "valid": not errors,
+        "outputs": outputs,
+    }
+
+
+def bench_get_data(workdir: str, ticker_counts: List[int], iterations: int) -> List[Dict[str, Any]]:
+    from agents.API_Agent import FinanceData, fetch_market_data
+    results = []
+    for count in ticker_counts:
+        run = timed_runs(
+            lambda i: fetch_market_data(FinanceData(tickers=symbols_for(count, i), time_range="6mo")),
+            iterations,
+            before=lambda: fakes.reset_state(workdir),
+        )
+        run.pop("outputs")
+        results.append({"tickers": count, **run})
+    return results
+
+
+def bench_articles(workdir: str, ticker_counts: List[int], iterations: int) -> List[Dict[str, Any]]:
+    from agents.scrapping_Agent import get_relevant_articles_from_prompt
+    results = []
+    for count in ticker_counts:
+        run = timed_runs(
+            lambda i: len(get_relevant_articles_from_prompt(prompt_for(symbols_for(count, i)))),
+            iterations,
+            before=lambda: fakes.reset_state(workdir),
+        )
+        chunks = run.pop("outputs")
+        results.append({"tickers": count, "chunks_mean": statistics.mean(chunks) if chunks else 0, **run})
+    return results
+
+
+def bench_embed_retrieve(workdir: str, chunk_counts: List[int], iterations: int) -> List[Dict[str, Any]]:
+    from agents.Retriever_Agent import embed_chunks, get_chunks
+    results = []
+    for count in chunk_counts:
+        embed_latencies, retrieve_latencies, errors = [], [], []
+        for i in range(iterations):
+            fakes.reset_state(workdir)
+            chunks = [fakes.synthetic_text(60, fakes.seed_for(str(count), str(i), str(n))) for n in range(count)]
+            try:
+                start = time.perf_counter()
+                embed_chunks(chunks, metadata={"tickers": ["AAPL"], "source_type": "article"})
+                embed_latencies.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                get_chunks("revenue guidance and analyst outlook", tickers=["AAPL"])
+                retrieve_latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(str(e))
+        embed = summarize(embed_latencies)
+        results.append({
+            "chunks": count,
+            "embed": embed,
+            "embed_chunks_per_second": round(count / embed["p50"], 1) if embed_latencies and embed["p50"] else None,
+            "retrieve": summarize(retrieve_latencies),
+            "errors": errors[:5],
+            "error_count": len(errors),
+            "valid": not errors,
+        })
+    return results
+
+
+def bench_end_to_end(workdir: str, installed: Dict[str, Any], ticker_counts: List[int],
+                     concurrency_levels: List[int], requests: int) -> List[Dict[str, Any]]:
+    """
+    Each scenario starts from empty caches. Request i asks about a window of the symbol pool
+    starting at i * tickers, so caches warm up the way they would under mixed traffic.
+    """
+    from orchestrator.manager import run_pipeline
+    results = []
+    for count in ticker_counts:
+        for concurrency in concurrency_levels:
+            fakes.reset_state(workdir)
+            installed["llm"].reset_counters()
+
+            def one(i: int) -> Dict[str, Any]:
+                start = time.perf_counter()
+                try:
+                    result = run_pipeline(prompt_for(symbols_for(count, i * count)))
+                    return {"seconds": time.perf_counter() - start, "timings": result["timings"],
+                            "errors": result["errors"], "cached": result["cached"]}
+                except Exception as e:
+                    return {"seconds": time.perf_counter() - start, "timings": {}, "errors": {"pipeline": str(e)}, "cached": False}
+
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+                runs = list(pool.map(one, range(requests)))
+            wall = time.perf_counter() - wall_start
+
+            stages: Dict[str, List[float]] = {}
+            for run in runs:
+                for stage, seconds in run["timings"].items():
+                    stages.setdefault(stage, []).append(seconds)
+            failed = [run["errors"] for run in runs if run["errors"]]
+            llm = installed["llm"].reset_counters()
+            results.append({
+                "tickers": count,
+                "concurrency": concurrency,
+                "requests": requests,
+                "throughput_rps": round(requests / wall, 3) if wall else None,
+                "end_to_end": summarize([run["seconds"] for run in runs]),
+                "first_request_seconds": round(runs[0]["seconds"], 4) if runs else None,
+                "stages": {stage: summarize(values) for stage, values in sorted(stages.items())},
+                "llm_calls_per_request": round(llm["calls"] / requests, 2),
+                "llm_prompt_chars_per_request": round(llm["prompt_chars"] / requests),
+                "answer_cache_hits": sum(1 for run in runs if run["cached"]),
+                "failed_requests": len(failed),
+                "valid": not failed,
+                "errors": failed[:5],
+            })
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def parse_ints(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def parse_latency(pairs: List[str]) -> Dict[str, float]:
+    overrides = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        if key not in fakes.DEFAULT_LATENCY:
+            raise SystemExit(f"Unknown latency key {key!r}; expected one of {sorted(fakes.DEFAULT_LATENCY)}")
+        overrides[key] = float(value)
+    return overrides
+
+
+def record(args, workdir: str) -> Dict[str, Any]:
+    """Runs the real services once per ticker count and stores their responses as fixtures."""
+    fixtures = fakes.Fixtures(args.record)
+    installed = fakes.install(workdir, fixtures=fixtures, record=True)
+    from orchestrator.manager import run_pipeline
+    for count in parse_ints(args.tickers):
+        fakes.reset_state(workdir)
+        symbols = symbols_for(count)
+        print(f"Recording {prompt_for(symbols)!r}", file=sys.stderr)
+        run_pipeline(prompt_for(symbols))
+    fixtures.save(args.record)
+    return {"recorded": args.record, "fixtures": fixtures.summary(), "installed": sorted(installed)}
+
+
+def run(args, workdir: str) -> Dict[str, Any]:
+    latency = fakes.Latency(parse_latency(args.latency), scale=args.latency_scale, jitter=args.jitter, seed=args.seed)
+    fixtures = fakes.Fixtures(args.fixtures)
+    installed = fakes.install(
+        workdir, fixtures=fixtures, latency=latency,
+        articles_per_ticker=args.articles_per_ticker, answer_words=args.answer_words,
+    )
+    from agents import telemetry
+
+    ticker_counts = parse_ints(args.tickers)
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "fixtures": args.fixtures,
+            "fixture_counts": fixtures.summary(),
+            "latency": latency.config(),
+            "seed": args.seed,
+            "tickers": ticker_counts,
+            "chunks": parse_ints(args.chunks),
+            "concurrency": parse_ints(args.concurrency),
+            "requests": args.requests,
+            "iterations": args.iterations,
+            "articles_per_ticker": args.articles_per_ticker,
+            "answer_words": args.answer_words,
+        },
+        "components": {},
+    }
+    # The pipeline prints per-request debug lines; keep the report on stdout clean
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        if "components" in args.suites:
+            report["components"]["get_data"] = bench_get_data(workdir, ticker_counts, args.iterations)
+            report["components"]["articles"] = bench_articles(workdir, ticker_counts, args.iterations)
+            report["components"]["embed_retrieve"] = bench_embed_retrieve(workdir, parse_ints(args.chunks), args.iterations)
+        if "end_to_end" in args.suites:
+            report["end_to_end"] = bench_end_to_end(
+                workdir, installed, ticker_counts, parse_ints(args.concurrency), args.requests
+            )
+    report["spans"] = telemetry.snapshot()
+    report["invalid_scenarios"] = invalid_scenarios(report)
+    return report
+
+
+def invalid_scenarios(report: Dict[str, Any]) -> List[str]:
+    """Scenarios with any failed request; their latency and throughput numbers don't mean anything."""
+    invalid = []
+    for component, scenarios in report.get("components", {}).items():
+        invalid.extend(f"{component}:{s.get('tickers', s.get('chunks'))}" for s in scenarios if not s["valid"])
+    invalid.extend(
+        f"end_to_end:{s['tickers']}x{s['concurrency']}" for s in report.get("end_to_end", []) if not s["valid"]
+    )
+    return invalid
+
+
+def compare(before_path: str, after_path: str) -> Dict[str, Any]:
+    """p50/p95 ratios (after / before) for every end-to-end scenario and stage present in both reports."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    baseline = {(s["tickers"], s["concurrency"]): s for s in before.get("end_to_end", [])}
+    rows = []
+    for scenario in after.get("end_to_end", []):
+        old = baseline.get((scenario["tickers"], scenario["concurrency"]))
+        if not old:
+            continue
+        pairs = {"end_to_end": (old["end_to_end"], scenario["end_to_end"])}
+        pairs.update({
+            stage: (old["stages"][stage], values)
+            for stage, values in scenario["stages"].items() if stage in old["stages"]
+        })
+        ratios = {}
+        for name, (a, b) in pairs.items():
+            ratios[name] = {
+                q: round(b[q] / a[q], 3) if a.get(q) else None for q in ("p50", "p95") if q in a and q in b
+            }
+        rows.append({
+            "tickers": scenario["tickers"],
+            "concurrency": scenario["concurrency"],
+            "throughput_ratio": round(scenario["throughput_rps"] / old["throughput_rps"], 3) if old.get("throughput_rps") else None,
+            "latency_ratios": ratios,
+        })
+    return {"before": before.get("commit"), "after": after.get("commit"), "scenarios": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="Replay recorded responses from this JSON file")
+    parser.add_argument("--record", help="Record live responses into this JSON file instead of benchmarking")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two JSON reports")
+    parser.add_argument("--suites", default="components,end_to_end")
+    parser.add_argument("--tickers", default="1,3,8", help="Ticker counts")
+    parser.add_argument("--chunks", default="64,256,1024", help="Chunk counts for embed_retrieve")
+    parser.add_argument("--concurrency", default="1,4,8", help="Concurrent pipeline requests")
+    parser.add_argument("--requests", type=int, default=16, help="Pipeline requests per end-to-end scenario")
+    parser.add_argument("--iterations", type=int, default=5, help="Runs per component scenario")
+    parser.add_argument("--articles-per-ticker", type=int, default=fakes.ARTICLES_PER_TICKER)
+    parser.add_argument("--answer-words", type=int, default=fakes.ANSWER_WORDS)
+    parser.add_argument("--latency", action="append", metavar="KEY=SECONDS", help="Override one injected latency")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply every injected latency")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Log-normal sigma of the latency jitter (0 = fixed)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Directory for caches and the vector store (default: a temp dir)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own output")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.compare:
+        report = compare(*args.compare)
+    else:
+        with contextlib.ExitStack() as stack:
+            workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix="bench_"))
+            fakes.set_environment(workdir)
+            report = record(args, workdir) if args.record else run(args, workdir)
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if report.get("invalid_scenarios"):
+        sys.exit(f"Requests failed in {len(report['invalid_scenarios'])} scenarios: {report['invalid_scenarios']}")
@@ -4,39 +4,113 @@ import os
 # Add parent directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import time
+from typing import Dict, Iterator, List, Optional
+from pydantic import BaseModel, Field
 from agents.API_Agent import run_financial_assistant
-from agents.scrapping_Agent import get_relevant_articles_from_prompt
+from agents.scrapping_Agent import iter_relevant_articles_from_prompt
+from data_ingestion.news_poller import NEWS_INGEST_MODE, iter_new_articles
+from agents import resources, telemetry
+from langchain_core.documents import Document
 
-# Global data list
-all_data = []
 
-def all_data_collection(prompt: str) -> list:
-    print("[DEBUG] Step 1: Calling run_financial_assistant...")
-    data = run_financial_assistant(prompt)
-    print(f"[DEBUG] Step 2: Retrieved {len(data)} items from financial assistant.")
+class ChunkRecord(BaseModel):
+    """One ingestible chunk with the metadata the retriever filters on."""
+    text: str
+    source_type: str = Field(..., description="assistant, article or news")
+    source: Optional[str] = None
+    tickers: List[str] = Field(default_factory=list)
+    published_at: Optional[float] = None
+
+    def to_document(self) -> Document:
+        metadata = {
+            "source_type": self.source_type,
+            "source": self.source,
+            "tickers": self.tickers or None,
+            "published_at": self.published_at,
+        }
+        return Document(page_content=self.text, metadata={k: v for k, v in metadata.items() if v is not None})
+
+
+def build_assistant_splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    # Paragraph, then line, then sentence boundaries so chunks stay semantically whole
+    return RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=50,
+        separators=["\n\n", "\n", ". ", "? ", "! ", "; ", " ", ""],
+    )
+
+
+resources.register("assistant_splitter", build_assistant_splitter)
+
+
+def iter_assistant_records(prompt: str, tickers: Optional[List[str]] = None) -> Iterator[ChunkRecord]:
+    with telemetry.span("assistant.answer") as attrs:
+        data = run_financial_assistant(prompt)
+        attrs["chars"] = len(data)
 
-    # Split data into 5 parts
-    length = len(data)
-    part_size = length // 5
-    parts = [data[i * part_size : (i + 1) * part_size] for i in range(4)]
-    parts.append(data[4 * part_size:])
-    print(f"[DEBUG] Step 3: Data split into 5 parts: {[len(p) for p in parts]}")
+    published_at = time.time()
+    for text in resources.get("assistant_splitter").split_text(data):
+        if text.strip():
+            yield ChunkRecord(
+                text=text,
+                source_type="assistant",
+                tickers=list(tickers or []),
+                published_at=published_at,
+            )
 
-    all_data.extend(parts)
-    print(f"[DEBUG] Step 4: Added split parts to all_data. Total length now: {len(all_data)}")
 
-    # Get articles
-    print("[DEBUG] Step 5: Calling get_relevant_articles_from_prompt...")
-    articles = get_relevant_articles_from_prompt(prompt)
-    print(f"[DEBUG] Step 6: Retrieved {len(articles)} articles.")
+def iter_article_records(prompt: str, tickers: Optional[List[str]] = None,
+                         pending_watermarks: Optional[Dict[str, Optional[str]]] = None,
+                         mode: str = NEWS_INGEST_MODE) -> Iterator[ChunkRecord]:
+    """
+    Article chunks for the prompt. In incremental mode (the default, see NEWS_INGEST_MODE)
+    only articles newer than each ticker's watermark and not yet ingested are scraped (none
+    for recently polled tickers); the new watermarks go to pending_watermarks when given
+    (see news_poller.commit_watermarks). "full" mode scrapes the whole look-back window.
+    """
+    if mode == "incremental" and tickers:
+        docs = iter_new_articles(tickers, pending_watermarks=pending_watermarks)
+    else:
+        docs = iter_relevant_articles_from_prompt(prompt)
+    for doc in docs:
+        metadata = doc.metadata
+        yield ChunkRecord(
+            text=doc.page_content,
+            source_type=metadata.get("source_type", "article"),
+            source=metadata.get("source"),
+            tickers=list(metadata.get("tickers") or []),
+            published_at=metadata.get("published_at"),
+        )
 
-    all_data.extend(articles)
-    print(f"[DEBUG] Step 7: Final all_data length after adding articles: {len(all_data)}")
 
-    return all_data
+def iter_data_collection(prompt: str, tickers: Optional[List[str]] = None,
+                         mode: str = NEWS_INGEST_MODE) -> Iterator[ChunkRecord]:
+    """
+    Per-request stream of chunk records: the assistant's answer, then scraped articles.
+    Nothing is kept between requests and chunks are produced only as fast as the consumer
+    (e.g. embed_chunk_stream) pulls them, so memory stays bounded.
+    """
+    yield from iter_assistant_records(prompt, tickers)
+    yield from iter_article_records(prompt, tickers, mode=mode)
+
+
+def assistant_documents(prompt: str, tickers: Optional[List[str]] = None) -> Iterator[Document]:
+    return (record.to_document() for record in iter_assistant_records(prompt, tickers))
+
+
+def article_documents(prompt: str, tickers: Optional[List[str]] = None,
+                      pending_watermarks: Optional[Dict[str, Optional[str]]] = None) -> Iterator[Document]:
+    return (record.to_document() for record in iter_article_records(prompt, tickers, pending_watermarks))
+
+
+def all_data_collection(prompt: str) -> list:
+    """Collects this request's chunks as Documents."""
+    return [record.to_document() for record in iter_data_collection(prompt)]
 
 if __name__ == "__main__":
     prompt = "Stock market analysis of Microsoft and Apple"
-    print(f"[DEBUG] Starting all_data_collection for prompt: {prompt}")
     collected_data = all_data_collection(prompt)
-    print(f"[DEBUG] Final collected data: {collected_data}")
+    print(f"Collected {len(collected_data)} chunks")
+    print(telemetry.render_prometheus())
@@ -0,0 +1,238 @@
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from agents import resources, telemetry
+from agents.scrapping_Agent import (
+    fetch_news_feed,
+    generate_alpha_vantage_url,
+    iter_article_documents,
+    relevant_feed_items,
+)
+from agents.ticker_extractor import get_default_time_from
+from agents.Retriever_Agent import embed_chunk_stream, ingested_sources
+
+load_dotenv()
+
+# "incremental" makes user requests fetch only news newer than each ticker's watermark
+# (and nothing at all for tickers polled within NEWS_FRESH_SECONDS); "full" re-queries
+# the whole look-back window on every request
+NEWS_INGEST_MODE = os.getenv("NEWS_INGEST_MODE", "incremental")
+NEWS_POLL_INTERVAL = float(os.getenv("NEWS_POLL_INTERVAL", "300"))
+NEWS_FRESH_SECONDS = float(os.getenv("NEWS_FRESH_SECONDS", str(NEWS_POLL_INTERVAL)))
+NEWS_POLL_LIMIT = int(os.getenv("NEWS_POLL_LIMIT", "50"))
+# Comma-separated tickers the background poller keeps warm, e.g. "AAPL,MSFT,NVDA"
+NEWS_WATCHLIST = [t.strip().upper() for t in os.getenv("NEWS_WATCHLIST", "").split(",") if t.strip()]
+# Callers wait this long for an in-flight poll of the same ticker before giving up
+NEWS_POLL_WAIT = float(os.getenv("NEWS_POLL_WAIT", "30"))
+# Articles that failed to scrape hold the watermark back (and are retried) for this long after publication
+NEWS_RETRY_HOURS = float(os.getenv("NEWS_RETRY_HOURS", "24"))
+NEWS_WATERMARK_DB = os.getenv("NEWS_WATERMARK_DB", os.path.join(resources.CACHE_DIR, "news_watermarks.sqlite3"))
+
+
+class NewsWatermarks:
+    """
+    Per-ticker high-water mark of the latest Alpha Vantage time_published ingested, and
+    when the ticker was last polled successfully. Stored in SQLite so restarts resume
+    where they left off.
+    """
+
+    def __init__(self, db_path: str):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks (ticker TEXT PRIMARY KEY, time_published TEXT, polled_at REAL)"
+        )
+        self._db.commit()
+        # One lock per ticker so concurrent requests don't fetch the same items twice
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, ticker: str):
+        """Returns (time_published or None, polled_at or None)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT time_published, polled_at FROM watermarks WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def advance(self, ticker: str, time_published: Optional[str]) -> None:
+        """Records a successful poll; the watermark only ever moves forward."""
+        with self._lock:
+            row = self._db.execute("SELECT time_published FROM watermarks WHERE ticker = ?", (ticker,)).fetchone()
+            current = row[0] if row else None
+            latest = max(filter(None, [current, time_published]), default=None)
+            self._db.execute(
+                "INSERT OR REPLACE INTO watermarks (ticker, time_published, polled_at) VALUES (?, ?, ?)",
+                (ticker, latest, time.time()),
+            )
+            self._db.commit()
+
+    def is_fresh(self, ticker: str, max_age: float = NEWS_FRESH_SECONDS) -> bool:
+        _, polled_at = self.get(ticker)
+        return polled_at is not None and time.time() - polled_at < max_age
+
+    def ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def all(self) -> Dict[str, Dict[str, Optional[float]]]:
+        with self._lock:
+            rows = self._db.execute("SELECT ticker, time_published, polled_at FROM watermarks").fetchall()
+        return {ticker: {"time_published": published, "polled_at": polled_at} for ticker, published, polled_at in rows}
+
+
+resources.register("news_watermarks", lambda: NewsWatermarks(NEWS_WATERMARK_DB))
+
+
+def get_news_watermarks() -> NewsWatermarks:
+    return resources.get("news_watermarks")
+
+
+def watermark_after(feed: List[dict], missed: List[str]) -> Optional[str]:
+    """
+    Newest time_published in feed that is older than every missed item, so articles that
+    failed to scrape (or were cut off by the deadline) are fetched again on the next poll.
+    Misses older than NEWS_RETRY_HOURS are given up on, so one dead link can't pin the watermark.
+    """
+    give_up = (datetime.now(timezone.utc) - timedelta(hours=NEWS_RETRY_HOURS)).strftime("%Y%m%dT%H%M%S")
+    retried = [published for published in missed if published > give_up]
+    if len(retried) < len(missed):
+        print(f"Giving up on {len(missed) - len(retried)} articles that failed to scrape")
+    limit = min(retried, default=None)
+    published = (item.get("time_published") or "" for item in feed)
+    return max((p for p in published if p and (limit is None or p < limit)), default=None)
+
+
+def iter_ticker_updates(ticker: str, skip_fresh: bool = True,
+                        pending_watermarks: Optional[Dict[str, Optional[str]]] = None) -> Iterator[Document]:
+    """
+    Yields chunk Documents for articles about ticker published after its watermark and not
+    yet in the vector store. Does nothing when the ticker was polled within
+    NEWS_FRESH_SECONDS (skip_fresh) or another thread is already polling it.
+
+    The new watermark is written to pending_watermarks for the caller to commit (see
+    commit_watermarks) once the chunks are stored; without it, it is committed when the
+    generator is exhausted.
+    """
+    news_watermarks = get_news_watermarks()
+    lock = news_watermarks.ticker_lock(ticker)
+    if not lock.acquire(timeout=NEWS_POLL_WAIT):
+        print(f"News poll for {ticker} still running, skipping")
+        return
+    try:
+        # Re-checked under the lock: a poll that just finished makes this one unnecessary
+        if skip_fresh and news_watermarks.is_fresh(ticker):
+            telemetry.incr("news_polls_skipped_total", ticker=ticker)
+            return
+        watermark, _ = news_watermarks.get(ticker)
+        # The first poll takes the most recent items of the default look-back; later ones page
+        # forward from the watermark oldest-first so a burst of news can't leave gaps
+        if watermark:
+            url = generate_alpha_vantage_url([ticker], watermark[:13], NEWS_POLL_LIMIT, sort="EARLIEST")
+        else:
+            url = generate_alpha_vantage_url([ticker], get_default_time_from(), NEWS_POLL_LIMIT, sort="LATEST")
+        feed = fetch_news_feed(url)
+        if feed is None:
+            return
+
+        newer = [item for item in feed if not watermark or (item.get("time_published") or "") > watermark]
+        relevant_items = relevant_feed_items(newer)
+        for url in ingested_sources(list(relevant_items)):
+            del relevant_items[url]
+        telemetry.incr("news_items_new_total", len(relevant_items), ticker=ticker)
+        scraped = yield from iter_article_documents(relevant_items)
+        missed = [item.get("time_published") or "" for url, (item, _) in relevant_items.items() if url not in scraped]
+        if pending_watermarks is None:
+            news_watermarks.advance(ticker, watermark_after(newer, missed))
+        else:
+            pending_watermarks[ticker] = watermark_after(newer, missed)
+    finally:
+        lock.release()
+
+
+def commit_watermarks(pending_watermarks: Dict[str, Optional[str]]) -> None:
+    """Advances the watermarks collected by iter_ticker_updates; call after the chunks are stored."""
+    for ticker, time_published in pending_watermarks.items():
+        get_news_watermarks().advance(ticker, time_published)
+    pending_watermarks.clear()
+
+
+def iter_new_articles(tickers: List[str], skip_fresh: bool = True,
+                      pending_watermarks: Optional[Dict[str, Optional[str]]] = None) -> Iterator[Document]:
+    """Incremental replacement for iter_relevant_articles_from_prompt, one poll per ticker."""
+    for ticker in dict.fromkeys(t.upper() for t in tickers):
+        yield from iter_ticker_updates(ticker, skip_fresh, pending_watermarks)
+
+
+def poll_once(tickers: List[str]) -> int:
+    """Ingests new articles for every ticker. Returns the number of chunks stored."""
+    stored = 0
+    for ticker in tickers:
+        pending: Dict[str, Optional[str]] = {}
+        try:
+            with telemetry.span("news.poll", ticker=ticker):
+                stored += embed_chunk_stream(
+                    iter_ticker_updates(ticker, skip_fresh=False, pending_watermarks=pending),
+                    on_complete=lambda: commit_watermarks(pending),
+                )
+        except Exception as e:
+            print(f"Error polling news for {ticker}: {e}")
+    return stored
+
+
+class NewsPoller:
+    """Background thread that polls a watchlist every interval seconds so user requests find the news already ingested."""
+
+    def __init__(self, watchlist: List[str], interval: float = NEWS_POLL_INTERVAL):
+        self.watchlist = list(dict.fromkeys(t.upper() for t in watchlist))
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "NewsPoller":
+        if self._thread is None and self.watchlist:
+            self._thread = threading.Thread(target=self._run, name="news-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            stored = poll_once(self.watchlist)
+            print(f"News poll stored {stored} chunks for {len(self.watchlist)} tickers")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+def start_news_poller(watchlist: Optional[List[str]] = None) -> Optional[NewsPoller]:
+    """Starts the poller for watchlist (default NEWS_WATCHLIST); returns None when it is empty."""
+    watchlist = watchlist if watchlist is not None else NEWS_WATCHLIST
+    if not watchlist:
+        return None
+    return NewsPoller(watchlist).start()
+
+
+if __name__ == "__main__":
+    watchlist = sys.argv[1:] or NEWS_WATCHLIST
+    if not watchlist:
+        sys.exit("Usage: python data_ingestion/news_poller.py AAPL MSFT ... (or set NEWS_WATCHLIST)")
+    while True:
+        started = time.monotonic()
+        print(f"Stored {poll_once(watchlist)} chunks; watermarks: {get_news_watermarks().all()}")
+        time.sleep(max(0.0, NEWS_POLL_INTERVAL - (time.monotonic() - started)))
@@ -2,16 +2,311 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from agents.Voice_Agent import voice_to_text,text_to_voice
-from agents.Retriever_Agent import embed_chunks,get_chunks
-from data_ingestion.data_collection import all_data_collection
-from agents.Analysis_Agent import Analysis
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import uuid
+from agents.Voice_Agent import TTS_OUTPUT_DIR,stream_voice_to_text,text_to_voice,pop_sentences,synthesize_segment,combine_segments,expire_outputs
+from agents.Retriever_Agent import embed_chunk_stream,search_chunks
+from agents.ticker_extractor import extract_tickers
+from agents.API_Agent import indicator_summary
+from data_ingestion.data_collection import article_documents,assistant_documents
+from data_ingestion.news_poller import commit_watermarks
+from agents.Analysis_Agent import Analysis,stream_analysis
+from agents import telemetry
+from agents.answer_cache import ANSWER_CACHE_ENABLED,answer_cache
+
+# Chunks buffered between the producers and the embedding stage before producers block
+EMBED_QUEUE_SIZE = 256
+STAGE_WORKERS = 4
+# Chunks retrieved as candidates for the analysis prompt; the context packer keeps what fits
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "20"))
+_DONE = object()
+
+
+class StageTimer:
+    """Collects wall-clock seconds per pipeline stage; safe to use from several threads."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            with telemetry.span(f"stage.{name}"):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings[name] = round(elapsed, 4)
+
+
+def produce(name: str, source: Callable[[], Iterable], chunks: queue.Queue, stop: threading.Event,
+            timer: StageTimer, errors: Dict[str, str]) -> None:
+    """Runs one producer stage and feeds its chunks into the embedding queue as they arrive."""
+    try:
+        with timer.stage(name):
+            for chunk in source():
+                if not put_unless_stopped(chunks, chunk, stop):
+                    return
+    except Exception as e:
+        print(f"[ERROR] Stage {name} failed: {e}")
+        errors[name] = str(e)
+    finally:
+        put_unless_stopped(chunks, _DONE, stop)
+
+
+def put_unless_stopped(chunks: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Blocks while the queue is full (back-pressure) but gives up once the consumer has stopped."""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def drain(chunks: queue.Queue, producers: int) -> Iterable:
+    remaining = producers
+    while remaining:
+        chunk = chunks.get()
+        if chunk is _DONE:
+            remaining -= 1
+            continue
+        yield chunk
+
+
+def collect_context(user_prompt: str, timer: StageTimer, errors: Dict[str, str]):
+    """
+    Runs every stage up to retrieval as a stage graph:
+
+        stt -> [assistant, articles] -> embedding -> retrieval
+         '--> [indicators] (history prefetch from partial transcripts for the analysis step)
+
+    The assistant and article producers run at the same time and stream chunks into the
+    embedding stage while it runs. End-to-end latency is the critical path rather than the
+    sum of the stages.
+
+    A semantically equivalent question answered recently (same tickers) short-circuits
+    everything after stt.
+
+    Returns:
+        tuple: (text_prompt, tickers, retrieved (Document, score) pairs, cached answer or None)
+    """
+    chunks: queue.Queue = queue.Queue(maxsize=EMBED_QUEUE_SIZE)
+    stop = threading.Event()
+    cached = None
+    pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+    try:
+        # Accept either a path to a recording or the question text itself. Recordings are
+        # transcribed incrementally and indicator history is prefetched for every ticker
+        # that shows up in the partial transcript.
+        prefetched: List[str] = []
+        prefetch_futures = []
+
+        def prefetch(text: str) -> None:
+            new = [t for t in extract_tickers(text) if t not in prefetched]
+            if new:
+                prefetched.extend(new)
+                prefetch_futures.append(pool.submit(indicator_summary, new))
+
+        with timer.stage("stt"):
+            if os.path.isfile(user_prompt):
+                text_prompt = ""
+                try:
+                    for text_prompt in stream_voice_to_text(user_prompt):
+                        prefetch(text_prompt)
+                except Exception as e:
+                    print(f"[ERROR] Stage stt failed: {e}")
+                    errors["stt"] = str(e)
+                text_prompt = text_prompt or "Could not understand audio."
+            else:
+                text_prompt = user_prompt
+        tickers: List[str] = extract_tickers(text_prompt)
+        cached = lookup_answer(text_prompt, tickers, timer, errors)
+        if cached is not None:
+            return text_prompt, tickers, [], cached
+        prefetch(text_prompt)
+
+        # News watermarks only move once the chunks they cover are in the store
+        pending_watermarks: Dict[str, Optional[str]] = {}
+        producers = {
+            "assistant": lambda: assistant_documents(text_prompt, tickers),
+            "articles": lambda: article_documents(text_prompt, tickers, pending_watermarks),
+        }
+        futures = [
+            pool.submit(produce, name, source, chunks, stop, timer, errors)
+            for name, source in producers.items()
+        ]
+        try:
+            with timer.stage("embedding"):
+                embed_chunk_stream(
+                    drain(chunks, len(producers)), on_complete=lambda: commit_watermarks(pending_watermarks)
+                )
+        except Exception as e:
+            print(f"[ERROR] Stage embedding failed: {e}")
+            errors["embedding"] = str(e)
+            stop.set()
+        for future in futures:
+            future.result()
+        # Only warms the history cache that Analysis reads from
+        for future in prefetch_futures:
+            future.result()
+    finally:
+        # A cached answer needs none of the prefetched history: drop what hasn't started and
+        # return without waiting for what has
+        pool.shutdown(wait=cached is None, cancel_futures=cached is not None)
+
+    with timer.stage("retrieval"):
+        retrieved = search_chunks(text_prompt, k=CONTEXT_CANDIDATES, tickers=tickers or None)
+        if not retrieved and tickers:
+            retrieved = search_chunks(text_prompt, k=CONTEXT_CANDIDATES)
+    return text_prompt, tickers, retrieved, None
+
+
+def lookup_answer(text_prompt: str, tickers: List[str], timer: StageTimer, errors: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    try:
+        with timer.stage("answer_cache"):
+            return answer_cache.lookup(text_prompt, tickers)
+    except Exception as e:
+        print(f"[ERROR] Answer cache lookup failed: {e}")
+        errors["answer_cache"] = str(e)
+        return None
+
+
+def remember_answer(text_prompt: str, tickers: List[str], report: str, errors: Dict[str, str]) -> None:
+    """Caches a finished report; runs where a stage failed are not reused."""
+    if not ANSWER_CACHE_ENABLED or errors or not report.strip():
+        return
+    try:
+        answer_cache.store(text_prompt, tickers, {"report": report})
+    except Exception as e:
+        print(f"[ERROR] Answer cache store failed: {e}")
+
+
+def run_pipeline(user_prompt: str) -> Dict[str, Any]:
+    """
+    Runs the full pipeline: collect_context, then analysis and tts.
+
+    Returns:
+        dict: text_prompt, tickers, report, audio path, per-stage timings, stage errors and
+        whether the report came from the answer cache
+    """
+    timer = StageTimer()
+    errors: Dict[str, str] = {}
+    start = time.perf_counter()
+    text_prompt, tickers, retrieved, cached = collect_context(user_prompt, timer, errors)
+
+    if cached is not None:
+        final = cached["report"]
+    else:
+        with timer.stage("analysis"):
+            final = Analysis(retrieved, tickers)
+        remember_answer(text_prompt, tickers, final, errors)
+    # Sentence audio is cached by text, so a cached report is re-voiced from the TTS cache
+    with timer.stage("tts"):
+        audio = text_to_voice(final)
+
+    timer.timings["total"] = round(time.perf_counter() - start, 4)
+    return {
+        "text_prompt": text_prompt,
+        "tickers": tickers,
+        "report": final,
+        "audio": audio,
+        "timings": timer.timings,
+        "errors": errors,
+        "cached": cached is not None,
+    }
+
 
 def run_manager(user_prompt: str):
-    text_prompt = voice_to_text(user_prompt)
-    text_data=all_data_collection(text_prompt)
-    embed_chunks(text_data)
-    chunks = get_chunks(user_prompt)
-    final=Analysis(chunks)
-    audio = text_to_voice(final)
-    return final,audio
+    result = run_pipeline(user_prompt)
+    return result["report"], result["audio"]
+
+
+class PipelineStream:
+    """
+    Iterates over the report tokens as the analysis model generates them (usable with
+    st.write_stream). Completed sentences are synthesized in the background while generation
+    continues; report, audio_segments (in reading order), the combined per-request audio file,
+    timings and errors are filled in once iteration ends. A cached answer is yielded at once.
+    With audio=False (text-only clients) no speech is synthesized at all.
+    """
+
+    def __init__(self, user_prompt: str, output_dir: str = TTS_OUTPUT_DIR, audio: bool = True):
+        self.user_prompt = user_prompt
+        self.output_dir = output_dir
+        self.synthesize_audio = audio
+        self.request_id = uuid.uuid4().hex
+        self.timer = StageTimer()
+        self.errors: Dict[str, str] = {}
+        self.text_prompt = ""
+        self.tickers: List[str] = []
+        self.report = ""
+        self.audio_segments: List[str] = []
+        self.audio: Optional[str] = None
+        self.cached = False
+
+    @property
+    def timings(self) -> Dict[str, float]:
+        return self.timer.timings
+
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        self.text_prompt, self.tickers, retrieved, cached = collect_context(self.user_prompt, self.timer, self.errors)
+        self.cached = cached is not None
+        tokens = iter([cached["report"]]) if self.cached else stream_analysis(retrieved, self.tickers)
+
+        audio_futures = []
+        parts: List[str] = []
+        buffer = ""
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts") as tts_pool:
+            def synthesize(sentences: List[str]) -> None:
+                if self.synthesize_audio:
+                    audio_futures.append(tts_pool.submit(synthesize_segment, " ".join(sentences)))
+
+            first_token = None
+            with self.timer.stage("analysis"):
+                for token in tokens:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        self.timer.timings["time_to_first_token"] = round(first_token - start, 4)
+                    parts.append(token)
+                    buffer += token
+                    sentences, buffer = pop_sentences(buffer)
+                    if sentences:
+                        synthesize(sentences)
+                    yield token
+            if buffer.strip():
+                synthesize([buffer.strip()])
+            if not self.cached:
+                remember_answer(self.text_prompt, self.tickers, "".join(parts), self.errors)
+
+            with self.timer.stage("tts"):
+                for future in audio_futures:
+                    try:
+                        self.audio_segments.append(future.result())
+                    except Exception as e:
+                        print(f"[ERROR] Stage tts failed: {e}")
+                        self.errors["tts"] = str(e)
+                if self.audio_segments:
+                    expire_outputs(self.output_dir)
+                    extension = os.path.splitext(self.audio_segments[0])[1]
+                    self.audio = combine_segments(
+                        self.audio_segments, os.path.join(self.output_dir, f"{self.request_id}{extension}")
+                    )
+
+        self.report = "".join(parts)
+        self.timer.timings["total"] = round(time.perf_counter() - start, 4)
+
+
+def stream_manager(user_prompt: str, audio: bool = True) -> PipelineStream:
+    return PipelineStream(user_prompt, audio=audio)
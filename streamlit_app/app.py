@@ -5,16 +5,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import streamlit as st
-from orchestrator.manager import run_manager
-import pyttsx3
-
-# Set up the TTS engine
-engine = pyttsx3.init()
-AUDIO_FILE = "output_audio.mp3"
-
-def save_audio(text, filename):
-    engine.save_to_file(text, filename)
-    engine.runAndWait()
+from orchestrator.manager import stream_manager
 
 st.title("Run Manager Text and Audio Generator")
 
@@ -23,20 +14,17 @@ user_input = st.text_area("Enter your text here:")
 
 if st.button("Run"):
     if user_input.strip():
-        # Run the manager function
-        output_text = run_manager(user_input)
-        
-        # Display the output text
+        # Run the manager and display the report as it is generated; sentences are
+        # synthesized in the background while the text streams in
         st.subheader("Generated Text")
-        st.write(output_text)
-        
-        # Save audio file
-        save_audio(output_text, AUDIO_FILE)
+        stream = stream_manager(user_input)
+        st.write_stream(stream)
 
-        # Play audio file
-        if os.path.exists(AUDIO_FILE):
+        # Play the per-request audio file
+        if stream.audio and os.path.exists(stream.audio):
             st.subheader("Generated Audio")
-            audio_file = open(AUDIO_FILE, 'rb')
-            st.audio(audio_file.read(), format='audio/mp3')
+            audio_format = "audio/wav" if stream.audio.endswith(".wav") else "audio/mp3"
+            with open(stream.audio, 'rb') as audio_file:
+                st.audio(audio_file.read(), format=audio_format)
     else:
         st.warning("Please enter some input text.")
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Keep every on-disk cache out of the working tree before any agent module is imported
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="agent_tests_"))
+os.environ.setdefault("TTS_OUTPUT_DIR", os.path.join(os.environ["CACHE_DIR"], "output"))
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+from agents import API_Agent, resources
+from agents.market_cache import market_cache
+
+
+def history_frame():
+    index = pd.date_range("2024-01-01", periods=5, freq="D")
+    return pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100}, index=index)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    market_cache.invalidate()
+    yield
+    market_cache.invalidate()
+
+
+def fake_fetch_history(ticker, time_range):
+    if ticker.ticker == "BAD":
+        raise ConnectionError("connection reset")
+    return history_frame()
+
+
+def test_one_failing_symbol_keeps_the_others(monkeypatch):
+    monkeypatch.setattr(API_Agent, "BATCH_HISTORY_MIN_TICKERS", 99)
+    monkeypatch.setattr(API_Agent, "fetch_history", fake_fetch_history)
+    errors = {}
+
+    histories = API_Agent.get_histories(["GOOD", "BAD"], "1mo", errors)
+
+    assert list(histories) == ["GOOD"]
+    assert errors == {"BAD": "connection reset"}
+
+
+def test_failed_batch_download_is_reported_per_symbol(monkeypatch):
+    def failing_download(symbols, time_range):
+        raise TimeoutError("download timed out")
+
+    monkeypatch.setattr(API_Agent, "fetch_batch_history", failing_download)
+    errors = {}
+
+    assert API_Agent.get_histories(["AAA", "BBB"], "1mo", errors) == {}
+    assert errors == {"AAA": "download timed out", "BBB": "download timed out"}
+
+
+def test_market_data_reports_the_history_error_under_its_symbol(monkeypatch):
+    monkeypatch.setattr(API_Agent, "BATCH_HISTORY_MIN_TICKERS", 99)
+    monkeypatch.setattr(API_Agent, "fetch_history", fake_fetch_history)
+    monkeypatch.setattr(API_Agent, "fetch_current_price", lambda ticker: 1.5)
+    monkeypatch.setattr(API_Agent, "fetch_options", lambda ticker: "No options data available")
+
+    data = API_Agent.fetch_market_data(API_Agent.FinanceData(tickers=["GOOD", "BAD"], time_range="1mo"))
+
+    assert "error" not in data["GOOD"]["history"]
+    assert "missing" not in data["GOOD"]
+    assert data["BAD"]["history"] == {"error": "Error: connection reset"}
+    assert data["BAD"]["missing"] == ["history"]
+
+
+class FakeNewsTool:
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def run(self, query):
+        self.calls += 1
+        return self.answers.pop(0)
+
+
+@pytest.fixture
+def news_tool():
+    def install(*answers):
+        tool = FakeNewsTool(*answers)
+        resources.register("yahoo_news_tool", lambda: tool)
+        return tool
+    yield install
+    resources.register("yahoo_news_tool", API_Agent.build_yahoo_news_tool)
+
+
+@pytest.mark.parametrize("unavailable", ["Company ticker ZZZZ not found.",
+                                         "No news found for company that searched with ZZZZ ticker.", ""])
+def test_unavailable_news_is_not_cached(news_tool, unavailable):
+    tool = news_tool(unavailable, "ZZZZ shares jumped after the launch.")
+
+    first = API_Agent.yahoo_finance_news.invoke("ZZZZ")
+    second = API_Agent.yahoo_finance_news.invoke("ZZZZ")
+
+    assert first == [unavailable or "No news found for ZZZZ."]
+    assert second == ["ZZZZ shares jumped after the launch."]
+    assert tool.calls == 2
+
+
+def test_news_is_served_from_the_cache(news_tool):
+    tool = news_tool("ZZZZ shares jumped after the launch.")
+
+    API_Agent.yahoo_finance_news.invoke("ZZZZ")
+
+    assert API_Agent.yahoo_finance_news.invoke("zzzz ") == ["ZZZZ shares jumped after the launch."]
+    assert tool.calls == 1
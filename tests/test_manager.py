@@ -0,0 +1,30 @@
+import threading
+import time
+
+from orchestrator import manager
+
+
+def test_cached_answer_does_not_wait_for_history_prefetch(tmp_path, monkeypatch):
+    recording = tmp_path / "question.wav"
+    recording.write_bytes(b"")
+    release = threading.Event()
+    started = []
+
+    def slow_indicator_summary(symbols):
+        started.append(symbols)
+        release.wait(5)
+        return ""
+
+    monkeypatch.setattr(manager, "stream_voice_to_text", lambda path: iter(["Apple stock", "Apple and Nvidia stock"]))
+    monkeypatch.setattr(manager, "indicator_summary", slow_indicator_summary)
+    monkeypatch.setattr(manager, "lookup_answer", lambda *args: {"report": "Cached report."})
+    begin = time.monotonic()
+    try:
+        result = manager.collect_context(str(recording), manager.StageTimer(), {})
+        elapsed = time.monotonic() - begin
+    finally:
+        release.set()
+
+    assert result == ("Apple and Nvidia stock", ["AAPL", "NVDA"], [], {"report": "Cached report."})
+    assert started
+    assert elapsed < 1
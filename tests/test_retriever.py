@@ -0,0 +1,68 @@
+import time
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from agents import Retriever_Agent, resources
+
+DIMENSIONS = 8
+
+
+@pytest.fixture
+def store(tmp_path):
+    from langchain_chroma import Chroma
+    return Chroma(
+        collection_name=Retriever_Agent.COLLECTION_NAME,
+        embedding_function=DeterministicFakeEmbedding(size=DIMENSIONS),
+        persist_directory=str(tmp_path / "chroma"),
+        collection_metadata={"hnsw:space": "cosine"},
+    )
+
+
+@pytest.fixture
+def vector_store(store, monkeypatch):
+    resources.register("vector_store", lambda: store)
+    monkeypatch.setattr(Retriever_Agent, "_last_expired_at", None)
+    yield store
+    resources.register("vector_store", Retriever_Agent.build_vector_store)
+
+
+def test_migration_backfills_ingestion_time(store):
+    legacy = store._client.create_collection(Retriever_Agent.LEGACY_COLLECTION_NAME)
+    legacy.add(
+        ids=["old", "dated"],
+        embeddings=[[0.1] * DIMENSIONS, [0.2] * DIMENSIONS],
+        documents=["Old chunk.", "Dated chunk."],
+        metadatas=[{"source": "https://example.com/a"}, {"ingested_at": 1000.0, "published_at": 900.0}],
+    )
+    before = time.time()
+
+    Retriever_Agent.migrate_legacy_collection(store, batch_size=1)
+
+    migrated = store._collection.get(ids=["old", "dated"], include=["metadatas"])
+    metadatas = dict(zip(migrated["ids"], migrated["metadatas"]))
+    assert metadatas["old"]["source"] == "https://example.com/a"
+    assert before <= metadatas["old"]["ingested_at"] <= time.time()
+    assert metadatas["old"]["published_at"] == metadatas["old"]["ingested_at"]
+    assert metadatas["dated"] == {"ingested_at": 1000.0, "published_at": 900.0}
+    assert Retriever_Agent.LEGACY_COLLECTION_NAME not in [c.name for c in store._client.list_collections()]
+
+
+def test_expiry_runs_at_most_once_per_interval(vector_store):
+    now = time.time()
+    vector_store._collection.add(
+        ids=["stale", "fresh"],
+        embeddings=[[0.1] * DIMENSIONS, [0.2] * DIMENSIONS],
+        documents=["Stale chunk.", "Fresh chunk."],
+        metadatas=[{"ingested_at": now - 1000}, {"ingested_at": now}],
+    )
+
+    assert Retriever_Agent.expire_documents(max_age_seconds=100, min_interval=600)
+    vector_store._collection.add(
+        ids=["stale2"], embeddings=[[0.3] * DIMENSIONS], documents=["Also stale."], metadatas=[{"ingested_at": now - 1000}]
+    )
+    assert not Retriever_Agent.expire_documents(max_age_seconds=100, min_interval=600)
+
+    assert sorted(vector_store._collection.get()["ids"]) == ["fresh", "stale2"]
+    assert Retriever_Agent.expire_documents(max_age_seconds=100, min_interval=0)
+    assert vector_store._collection.get()["ids"] == ["fresh"]
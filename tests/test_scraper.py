@@ -0,0 +1,129 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agents import resources, scrapping_Agent
+from agents.article_cache import ArticleCache
+
+PAGE = "<html><body><p>Shares rose after earnings.</p><p>Analysts raised targets.</p></body></html>"
+ETAG = '"v1"'
+
+
+class StandIn(ThreadingHTTPServer):
+    """Local article site: /slow/<seconds>/<n> answers after a delay, /etag supports If-None-Match."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.requests = []
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.requests.append((self.path, dict(self.headers)))
+        try:
+            if self.path.startswith("/slow/"):
+                time.sleep(float(self.path.split("/")[2]))
+            if self.path == "/etag" and self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = PAGE.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            if self.path == "/etag":
+                self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture
+def site():
+    server = StandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    session = scrapping_Agent.build_session()
+    session.trust_env = False  # No proxies for 127.0.0.1
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def article_cache(tmp_path, monkeypatch):
+    cache = ArticleCache(str(tmp_path / "articles.sqlite3"))
+    resources.register("article_cache", lambda: cache)
+    # Per-host semaphores are created on first use; start each test without them
+    monkeypatch.setattr(scrapping_Agent, "host_limits", {})
+    return cache
+
+
+def test_per_host_limit_caps_concurrent_requests(site, session, article_cache, monkeypatch):
+    monkeypatch.setattr(scrapping_Agent, "SCRAPE_PER_HOST", 2)
+    urls = [site.url(f"/slow/0.2/{i}") for i in range(6)]
+
+    scraped = scrapping_Agent.scrape_articles(urls, session, max_workers=6, deadline_seconds=10)
+
+    assert set(scraped) == set(urls)
+    assert site.max_active == 2
+
+
+def test_deadline_abandons_slow_pages(site, session, article_cache):
+    fast, slow = site.url("/fast"), site.url("/slow/3/0")
+    start = time.monotonic()
+
+    results = dict(scrapping_Agent.iter_scraped_articles([fast, slow], session, deadline_seconds=0.5))
+
+    assert time.monotonic() - start < 2
+    assert results[fast] == "Shares rose after earnings. Analysts raised targets."
+    assert slow not in results
+
+
+def test_stale_entry_is_revalidated_with_conditional_get(site, session, tmp_path):
+    cache = ArticleCache(str(tmp_path / "articles.sqlite3"), fresh_seconds=0)
+    resources.register("article_cache", lambda: cache)
+    url = site.url("/etag")
+
+    first = scrapping_Agent.fetch_article_text(url, session)
+    second = scrapping_Agent.fetch_article_text(url, session)
+
+    assert first == second == "Shares rose after earnings. Analysts raised targets."
+    assert "If-None-Match" not in site.requests[0][1]
+    assert site.requests[1][1].get("If-None-Match") == ETAG
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_fresh_entry_is_served_without_a_request(site, session, article_cache):
+    url = site.url("/etag")
+
+    scrapping_Agent.fetch_article_text(url, session)
+    scrapping_Agent.fetch_article_text(url, session)
+
+    assert len(site.requests) == 1
+    assert article_cache.stats()["hits"] == 1
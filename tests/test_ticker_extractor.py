@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+from agents.ticker_extractor import extract_tickers, get_default_time_from
+
+
+def test_possessive_names_keep_their_last_letter():
+    assert extract_tickers("Goldman Sachs's earnings beat estimates") == ["GS"]
+    assert extract_tickers("What did Morgan Stanley's analysts say?") == ["MS"]
+    assert extract_tickers("Compare Tesla's margins with Nike.") == ["TSLA", "NKE"]
+
+
+def test_lowercase_dictionary_names_count_in_market_prompts():
+    assert extract_tickers("Provide stock markets data of microsoft and apple") == ["MSFT", "AAPL"]
+    assert extract_tickers("visa earnings this quarter") == ["V"]
+    assert extract_tickers("Apple shares fell") == ["AAPL"]
+
+
+def test_dictionary_names_outside_market_prompts_are_ignored():
+    assert extract_tickers("I use my Visa card") == []
+    assert extract_tickers("Book an Uber to the airport") == []
+    assert extract_tickers("an apple a day") == []
+
+
+def test_plain_company_names_need_no_market_context():
+    assert extract_tickers("tell me about nvidia and microsoft") == ["NVDA", "MSFT"]
+
+
+def test_default_time_from_is_a_month_back():
+    start = datetime.strptime(get_default_time_from(), "%Y%m%dT%H%M").replace(tzinfo=timezone.utc)
+
+    assert timedelta(days=29) < datetime.now(timezone.utc) - start < timedelta(days=31)
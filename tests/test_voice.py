@@ -0,0 +1,185 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from agents import Voice_Agent
+
+RATE = 16000
+
+
+def write_wav(path, samples, rate=RATE, width=2, channels=1):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(Voice_Agent.encode_samples(np.asarray(samples), width))
+    return str(path)
+
+
+def speech_with_gaps(utterances, amplitude, gap_seconds=1.0, speech_seconds=0.5):
+    """A 440 Hz tone per utterance, separated by silence with a little noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(RATE * speech_seconds)) / RATE
+    tone = amplitude * np.sin(2 * np.pi * 440 * t)
+    parts = []
+    for _ in range(utterances):
+        parts.append(rng.normal(0, amplitude / 500, int(RATE * gap_seconds)))
+        parts.append(tone)
+    parts.append(np.zeros(int(RATE * gap_seconds)))
+    return np.concatenate(parts).round()
+
+
+class FakeSTTBackend:
+    """Offline recognizer: names each utterance by its position."""
+    name = "fake"
+
+    def __init__(self):
+        self.count = 0
+
+    def transcribe(self, audio):
+        self.count += 1
+        return f"part{self.count}"
+
+
+class FakeTTSBackend:
+    """Offline stand-in for the speech engine: one short tone per call, length follows the text."""
+    extension = "wav"
+
+    def __init__(self, name="fake"):
+        self.name = name
+        self.calls = []
+
+    def synthesize(self, text, output_path):
+        self.calls.append(text)
+        write_wav(output_path, np.full(len(text) * 10, 1000))
+
+
+@pytest.fixture
+def tts_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "tts_cache"
+    monkeypatch.setattr(Voice_Agent, "TTS_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
+def test_pop_sentences_keeps_the_unfinished_remainder():
+    sentences, rest = Voice_Agent.pop_sentences("Stocks rose. Bonds fell! Oil was")
+
+    assert sentences == ["Stocks rose.", "Bonds fell!"]
+    assert rest == "Oil was"
+
+
+def test_pop_sentences_needs_whitespace_after_the_stop():
+    assert Voice_Agent.pop_sentences("Shares hit 3.5") == ([], "Shares hit 3.5")
+
+
+def test_split_sentences_groups_short_sentences_up_to_max_chars():
+    text = "One two. Three four. Five six seven eight nine ten."
+
+    assert Voice_Agent.split_sentences(text, max_chars=20) == [
+        "One two. Three four.",
+        "Five six seven eight nine ten.",
+    ]
+    assert Voice_Agent.split_sentences(text) == [text]
+    assert Voice_Agent.split_sentences("   ") == []
+
+
+def test_synthesize_segment_reuses_the_cached_file(tts_cache):
+    backend = FakeTTSBackend()
+
+    first = Voice_Agent.synthesize_segment("Markets closed higher.", backend)
+    second = Voice_Agent.synthesize_segment("Markets closed higher.", backend)
+
+    assert first == second
+    assert os.path.dirname(first) == str(tts_cache)
+    assert backend.calls == ["Markets closed higher."]
+    assert not [name for name in os.listdir(tts_cache) if ".tmp." in name]
+
+
+def test_synthesize_segment_keys_on_backend_and_text(tts_cache):
+    backend, other = FakeTTSBackend(), FakeTTSBackend("other")
+
+    paths = {
+        Voice_Agent.synthesize_segment("Markets closed higher.", backend),
+        Voice_Agent.synthesize_segment("Markets closed lower.", backend),
+        Voice_Agent.synthesize_segment("Markets closed higher.", other),
+    }
+
+    assert len(paths) == 3
+    assert len(backend.calls) == 2 and len(other.calls) == 1
+
+
+def test_combine_segments_reframes_wav_data(tmp_path):
+    first = write_wav(tmp_path / "a.wav", np.full(100, 1))
+    second = write_wav(tmp_path / "b.wav", np.full(50, 2))
+
+    output = Voice_Agent.combine_segments([first, second], str(tmp_path / "out" / "joined.wav"))
+
+    with wave.open(output, "rb") as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, RATE)
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    assert samples.tolist() == [1] * 100 + [2] * 50
+
+
+def test_combine_segments_concatenates_mp3_frames(tmp_path):
+    paths = []
+    for name, data in (("a.mp3", b"\xff\xfbfirst"), ("b.mp3", b"\xff\xfbsecond")):
+        (tmp_path / name).write_bytes(data)
+        paths.append(str(tmp_path / name))
+
+    output = Voice_Agent.combine_segments(paths, str(tmp_path / "joined.mp3"))
+
+    with open(output, "rb") as f:
+        assert f.read() == b"\xff\xfbfirst\xff\xfbsecond"
+
+
+def test_text_to_voice_joins_segments_in_reading_order(tts_cache, tmp_path):
+    backend = FakeTTSBackend()
+    text = "First sentence here. " * 20 + "Last one."
+
+    output = Voice_Agent.text_to_voice(text, str(tmp_path / "answer.mp3"), backend)
+
+    assert output == str(tmp_path / "answer.wav")
+    segments = Voice_Agent.split_sentences(text)
+    assert sorted(backend.calls) == sorted(segments)
+    with wave.open(output, "rb") as wav:
+        assert wav.getnframes() == sum(len(segment) * 10 for segment in segments)
+
+
+@pytest.mark.parametrize("width, amplitude", [(2, 10000), (3, 10000 * 256)])
+def test_vad_splits_on_silence_gaps(tmp_path, width, amplitude):
+    path = write_wav(tmp_path / "speech.wav", speech_with_gaps(3, amplitude), width=width)
+
+    segments = list(Voice_Agent.iter_voice_segments(path))
+
+    assert len(segments) == 3
+    for segment in segments:
+        assert segment.sample_width == width
+        # 0.5 s of speech plus the trailing silence that closed the utterance
+        seconds = len(segment.frame_data) / width / RATE
+        assert 0.5 < seconds < 0.5 + (Voice_Agent.VAD_SILENCE_MS + 2 * Voice_Agent.VAD_WINDOW_MS) / 1000
+
+
+def test_vad_ignores_blips_shorter_than_min_speech(tmp_path):
+    path = write_wav(tmp_path / "blip.wav", speech_with_gaps(2, 10000, speech_seconds=0.1))
+
+    assert list(Voice_Agent.iter_voice_segments(path)) == []
+
+
+def test_24_bit_stereo_is_downmixed_without_losing_the_sign(tmp_path):
+    left = np.array([-(2 ** 23), -5, 0, 2 ** 23 - 1])
+    right = np.array([-(2 ** 23), -7, 2, 2 ** 23 - 1])
+    frames = Voice_Agent.encode_samples(np.column_stack([left, right]).ravel(), 3)
+
+    mono = Voice_Agent.decode_samples(Voice_Agent.to_mono(frames, 3, 2), 3)
+
+    assert mono.tolist() == [-(2 ** 23), -6, 1, 2 ** 23 - 1]
+
+
+def test_stream_voice_to_text_stitches_24_bit_utterances(tmp_path):
+    path = write_wav(tmp_path / "speech.wav", speech_with_gaps(3, 10000 * 256), width=3)
+
+    transcripts = list(Voice_Agent.stream_voice_to_text(path, FakeSTTBackend(), workers=1))
+
+    assert transcripts == ["part1", "part1 part2", "part1 part2 part3"]